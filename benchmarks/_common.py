@@ -0,0 +1,84 @@
+"""
+Общие функции бенчмарков
+========================
+
+"""
+from json import dump, load
+from pathlib import Path
+from platform import python_version
+from statistics import median
+from time import perf_counter
+import subprocess
+import sys
+import typing
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+def load_con(path: str) -> dict:
+    """
+    Параметры подключения из JSON файла (см. `segmenter/__main__.py`)
+    """
+    with open(path) as f:
+        return load(f)
+
+def url(con: dict) -> str:
+    return '{driver}://{login}:{password}@{host}:{port}/{schema}'.format(**con)
+
+def environment(sql_eng: typing.Any = None) -> dict:
+    """
+    Окружение замера: коммит, версии интерпретатора, библиотек и хранилища
+    """
+    import pandas, sqlalchemy
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    env = {
+        'commit': commit,
+        'dirty': dirty,
+        'python': python_version(),
+        'pandas': pandas.__version__,
+        'sqlalchemy': sqlalchemy.__version__,
+    }
+    if sql_eng is not None:
+        with sql_eng.connect() as con:
+            env['postgres'] = con.execute(sqlalchemy.text('show server_version')).scalar()
+    return env
+
+def timeit(
+    func: typing.Callable[[], typing.Any],
+    repeat: int = 5,
+    number: int = 1,
+    setup: typing.Union[typing.Callable[[], typing.Any], None] = None
+) -> dict:
+    """
+    Замер функции
+    =============
+
+    Выполняет `func` `repeat` раз по `number` вызовов (перед каждым замером –
+    `setup`) и возвращает медиану, минимум и все замеры времени одного вызова
+    в секундах.
+
+    """
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = perf_counter()
+        for __ in range(number):
+            func()
+        runs.append((perf_counter() - started) / number)
+    return {'median': median(runs), 'min': min(runs), 'runs': runs}
+
+def save(result: dict, path: typing.Union[str, None]) -> None:
+    if path:
+        with open(path, 'w') as f:
+            dump(result, f, indent=2, default=str)
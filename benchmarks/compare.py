@@ -0,0 +1,48 @@
+"""
+Сравнение результатов бенчмарков
+================================
+
+    python benchmarks/compare.py base.json head.json [--threshold 0.1]
+
+Сопоставляет замеры двух запусков `benchmarks/suite.py` по наименованию и
+параметрам и выводит отношение медиан (head / base); замеры, замедлившиеся
+больше чем на `--threshold`, отмечаются, и код возврата в этом случае – 1.
+
+"""
+from argparse import ArgumentParser
+from json import dumps, load
+import sys
+
+def key(result: dict) -> str:
+    return result['name'] + ' ' + dumps(result.get('params', {}), sort_keys=True)
+
+def main() -> None:
+    parser = ArgumentParser(description='Сравнение результатов бенчмарков')
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = load(f)
+    with open(args.head) as f:
+        head = load(f)
+
+    print('base: {}  head: {}'.format(
+        base['environment'].get('commit'), head['environment'].get('commit')
+    ))
+    base = {key(_): _ for _ in base['results']}
+    regressed = False
+    for _ in head['results']:
+        if key(_) not in base:
+            print('{:<80} {:>12.6f}s {:>10}'.format(key(_)[:80], _['median'], 'new'))
+            continue
+        ratio = _['median'] / base[key(_)]['median'] if base[key(_)]['median'] else float('inf')
+        mark = '!' if ratio > 1 + args.threshold else ''
+        regressed |= bool(mark)
+        print('{:<80} {:>12.6f}s {:>9.2f}x{}'.format(key(_)[:80], _['median'], ratio, mark))
+
+    sys.exit(1 if regressed else 0)
+
+if __name__ == '__main__':
+    main()
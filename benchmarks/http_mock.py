@@ -0,0 +1,142 @@
+"""
+Тестовый HTTP сервис аудиторий
+==============================
+
+    python benchmarks/http_mock.py [--port 8080] [--rate 50] [--fail 0.05]
+
+Реализует API `HttpTarget` (см. `segmenter.modules.updaters.http`) в памяти:
+    GET    /audiences                  – перечень аудиторий
+    POST   /audiences                  – создание аудитории {"name": ...}
+    POST   /audiences/{id}/members     – добавление {"ids": [...]}
+    DELETE /audiences/{id}/members     – удаление {"ids": [...]}
+    GET    /audiences/{id}/members     – перечень идентификаторов аудитории
+
+Запросы сверх `--rate` в секунду отклоняются 429 ответом с `Retry-After`
+заголовком, доля `--fail` запросов – 503 ответом, что позволяет проверить
+ограничение частоты и повторы запросов таргета.
+
+"""
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps, loads
+from random import random
+from threading import Lock, Thread
+from time import monotonic
+import typing
+
+class State:
+    """
+    Состояние сервиса: аудитории и счетчики запросов
+    """
+
+    def __init__(self, rate: typing.Union[float, None] = None, fail: float = 0.0) -> None:
+        self.rate = rate
+        self.fail = fail
+        self.lock = Lock()
+        self.audiences: typing.Dict[str, dict] = {}
+        self.requests = 0
+        self.throttled = 0
+        self.failed = 0
+        self._window: typing.List[float] = []
+
+    def admit(self) -> typing.Union[int, None]:
+        """
+        Статус отказа в обработке запроса или None
+        """
+        with self.lock:
+            self.requests += 1
+            now = monotonic()
+            self._window = [_ for _ in self._window if now - _ < 1]
+            if self.rate and len(self._window) >= self.rate:
+                self.throttled += 1
+                return 429
+            self._window.append(now)
+            if random() < self.fail:
+                self.failed += 1
+                return 503
+        return None
+
+def handler(state: State) -> type:
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def reply(self, status: int, body: typing.Any = None, headers: dict = {}) -> None:
+            data = dumps(body).encode() if body is not None else b''
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def handle_request(self) -> None:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = loads(self.rfile.read(length)) if length else None
+            status = state.admit()
+            if status:
+                return self.reply(status, {'error': status}, {'Retry-After': '1'} if status == 429 else {})
+
+            parts = self.path.strip('/').split('/')
+            with state.lock:
+                if parts == ['audiences'] and self.command == 'GET':
+                    return self.reply(200, [
+                        {'id': k, 'name': v['name'], 'size': len(v['ids'])}
+                            for k, v in state.audiences.items()
+                    ])
+                if parts == ['audiences'] and self.command == 'POST':
+                    id = str(len(state.audiences) + 1)
+                    state.audiences[id] = {'name': body['name'], 'ids': set()}
+                    return self.reply(201, {'id': id, 'name': body['name']})
+                if len(parts) == 3 and parts[0] == 'audiences' and parts[2] == 'members':
+                    audience = state.audiences.get(parts[1])
+                    if audience is None:
+                        return self.reply(404, {'error': 'not found'})
+                    if self.command == 'GET':
+                        return self.reply(200, sorted(audience['ids']))
+                    if self.command == 'POST':
+                        audience['ids'].update(body['ids'])
+                    else:
+                        audience['ids'].difference_update(body['ids'])
+                    return self.reply(200, {'size': len(audience['ids'])})
+            return self.reply(404, {'error': 'not found'})
+
+        do_GET = do_POST = do_DELETE = handle_request
+
+    return Handler
+
+def start(
+    port: int = 0,
+    rate: typing.Union[float, None] = None,
+    fail: float = 0.0
+) -> typing.Tuple[ThreadingHTTPServer, State]:
+    """
+    Запуск сервиса в фоновом потоке
+    ===============================
+
+    Возвращает:
+        typing.Tuple[ThreadingHTTPServer, State]: сервер (адрес –
+            `server.server_address`, остановка – `server.shutdown()`) и
+            состояние сервиса
+
+    """
+    state = State(rate, fail)
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler(state))
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+def main() -> None:
+    parser = ArgumentParser(description='Тестовый HTTP сервис аудиторий')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--rate', type=float)
+    parser.add_argument('--fail', type=float, default=0.0)
+    args = parser.parse_args()
+
+    state = State(args.rate, args.fail)
+    ThreadingHTTPServer(('127.0.0.1', args.port), handler(state)).serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Замер времени запуска
+=====================
+
+    python benchmarks/startup.py [con.json] [--repeat 7] [--output startup.json]
+
+Каждый этап замеряется в отдельном процессе интерпретатора, чтобы импорты
+предыдущих замеров не попадали в кэш модулей:
+    import: `import segmenter`
+    segmenter: `from segmenter import Segmenter`
+    init: `Segmenter(con)` – при переданном файле подключения
+
+Результат (медиана и все замеры в секундах) выводится в JSON того же вида, что
+и у `benchmarks/suite.py`, и сравнивается `benchmarks/compare.py`.
+
+"""
+from _common import ROOT, environment, save
+from argparse import ArgumentParser
+from json import dumps
+from statistics import median
+import subprocess
+import sys
+
+STAGES = {
+    'import': 'import segmenter',
+    'segmenter': 'from segmenter import Segmenter',
+    'init': (
+        'from json import load\n'
+        'from segmenter import Segmenter\n'
+        'Segmenter(load(open({con!r})), cfg_table="segmenter", log_table="segmenter_log", consumers=None)'
+    ),
+}
+
+TIMER = (
+    'from time import perf_counter\n'
+    '__t = perf_counter()\n'
+    '{code}\n'
+    'print(perf_counter() - __t)\n'
+)
+
+def measure(code: str, repeat: int) -> dict:
+    """
+    Замер фрагмента кода в `repeat` отдельных процессах
+    """
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, '-c', TIMER.format(code=code)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        runs.append(float(out.stdout.strip().splitlines()[-1]))
+    return {'median': median(runs), 'min': min(runs), 'runs': runs}
+
+def main() -> None:
+    parser = ArgumentParser(description='Замер времени запуска сегментера')
+    parser.add_argument('con', nargs='?', help='путь к JSON файлу с параметрами подключения')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--output', help='путь к JSON файлу с результатами')
+    args = parser.parse_args()
+
+    result = {'environment': environment(), 'results': [
+        {'name': 'startup.' + stage, 'params': {}, **measure(code.format(con=args.con), args.repeat)}
+            for stage, code in STAGES.items() if args.con or stage != 'init'
+    ]}
+
+    save(result, args.output)
+    print(dumps({_['name']: _['median'] for _ in result['results']}, indent=2))
+
+if __name__ == '__main__':
+    main()
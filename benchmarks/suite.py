@@ -0,0 +1,477 @@
+"""
+Бенчмарки сегментера
+====================
+
+    python benchmarks/suite.py con.json [--scales 1000000 10000000]
+        [--churns 0.01 0.1] [--repeat 3] [--only refresh refreshers checks logger]
+        [--output result.json]
+
+Создает в схеме `segmenter_bench` хранилища синтетические сегменты – по одной
+сегментной таблице на каждое сочетание размера (`--scales`, записей) и доли
+изменений между пересчетами (`--churns`): половина изменений – смена хэша
+существующих записей, половина – сдвиг окна идентификаторов (добавленные и
+удаленные записи). Запрос сегмента зависит от номера прогона в таблице
+`segmenter_bench.run`, поэтому каждый следующий пересчет применяет к сегменту
+заданную долю изменений.
+
+Группы замеров:
+    refresh: `Segmenter.refresh_segments` целиком – первичная загрузка и
+        пересчеты с изменениями
+    refreshers: `refresh_query` и `refresh_dataframe` для каждого сегмента
+    checks: проверки (`check_cron`, `check_cron_batch`,
+        `check_consistency_batch`, `check_table`) на `--segments` сегментах
+    logger: накладные расходы `Logger.decorate` на каждом уровне детализации
+        и пропускная способность `LogSink`
+    upload: выгрузка `--ids` идентификаторов `HttpTarget` и `AsyncHttpTarget`
+        таргетами в тестовый HTTP сервис (см. `benchmarks/http_mock.py`) с
+        разными `--chunksizes`
+    idset: объем памяти и время разности множеств идентификаторов сегментов
+        (`--scales`, `--churns`) – `object` атрибут датафрейма против `IdSet`
+    hashing: нормализация и хэширование `--ids` адресов почты `Hasher` с
+        `--workers` процессами – без кэша, с кэшем в памяти и в хранилище
+
+Результат – JSON с окружением (коммит, версии) и списком замеров вида
+{"name": ..., "params": {...}, "median": ..., "min": ..., "runs": [...]}
+(замеры памяти дополнительно содержат "bytes"),
+который сравнивается с результатом другого коммита `benchmarks/compare.py`.
+
+"""
+from _common import ROOT, environment, load_con, save, timeit, url
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from datetime import datetime
+from json import dumps
+from uuid import NAMESPACE_URL, uuid5
+import pandas as pd
+import typing
+
+SCHEMA = 'segmenter_bench'
+
+def segment_name(scale: int, churn: float) -> str:
+    return 'seg_{}_{}'.format(scale, round(churn * 1000))
+
+def segment_id(scale: int, churn: float) -> str:
+    return str(uuid5(NAMESPACE_URL, segment_name(scale, churn)))
+
+def segment_sql(scale: int, churn: float) -> str:
+    """
+    Запрос сегмента: `churn` / 2 записей меняют хэш, окно идентификаторов
+    сдвигается на `churn` / 2 записей с каждым прогоном
+    """
+    run = '(select tag from {}.run)'.format(SCHEMA)
+    shift = int(scale * churn / 2)
+    modulo = max(int(2 / churn), 1) if churn else 0
+    changed = " || case when g % {} = 0 then {}::text else '' end".format(modulo, run) \
+        if modulo else ''
+    return (
+        "select g::varchar as id, '{segment_id}'::uuid as segment_id, "
+        "md5(g::text{changed}) as hash_email "
+        "from generate_series(1 + {shift} * {run}, {scale} + {shift} * {run}) g"
+    ).format(
+        segment_id=segment_id(scale, churn), changed=changed,
+        shift=shift, run=run, scale=scale
+    )
+
+def setup(sql_eng: typing.Any, scales: list, churns: list, digest: bool, summary: str) -> None:
+    """
+    Создание схемы, логовой и конфигурационной таблиц и сегментных таблиц
+    """
+    from segmenter import __file__ as package
+    from pathlib import Path
+    from sqlalchemy import text
+
+    log_ddl = (Path(package).parent / '__tables__' / 'segmenter_log.sql').read_text()
+    log_ddl = log_ddl.replace('public.segmenter_log', SCHEMA + '.log')
+
+    with sql_eng.begin() as con:
+        con.execute(text("""
+            drop schema if exists {schema} cascade;
+            create schema {schema};
+            create table {schema}.run (tag int not null);
+            insert into {schema}.run values (0);
+            create table {schema}.cfg (
+                segment_id uuid, segment_name varchar, table_name varchar,
+                refresh_auto bool, refresh_cron varchar, refresh_params json,
+                refresh_depends varchar[], updated timestamp not null default now()
+            );
+        """.format(schema=SCHEMA)))
+        con.execute(text(log_ddl))
+        for scale in scales:
+            for churn in churns:
+                name = segment_name(scale, churn)
+                con.execute(text("""
+                    create table {schema}.{name} (
+                        segment_id      uuid        not null,
+                        id              varchar     null,
+                        hash_email      varchar     null,
+                        digest          varchar     null,
+                        actual_begin    timestamp   not null    default now(),
+                        actual_end      timestamp   not null    default 'infinity',
+                        processed       timestamp   not null    default now()
+                    );
+                    create index on {schema}.{name} using btree(id);
+                    /* Запись сегмента для прохождения check_consistency */
+                    insert into {schema}.{name} (segment_id, id) values ('{id}', '0');
+                """.format(schema=SCHEMA, name=name, id=segment_id(scale, churn))))
+                con.execute(text("""
+                    insert into {schema}.cfg (
+                        segment_id, segment_name, table_name, refresh_auto,
+                        refresh_cron, refresh_params
+                    ) values (:id, :name, :table, true, '* * * * *', :params)
+                """.format(schema=SCHEMA)), {
+                    'id': segment_id(scale, churn),
+                    'name': name,
+                    'table': '{}.{}'.format(SCHEMA, name),
+                    'params': dumps({'query': {
+                        'sql': segment_sql(scale, churn),
+                        'digest': digest,
+                        'summary': summary
+                    }}),
+                })
+
+def next_run(sql_eng: typing.Any) -> None:
+    from sqlalchemy import text
+    with sql_eng.begin() as con:
+        con.execute(text('update {}.run set tag = tag + 1'.format(SCHEMA)))
+
+def bench_refresh(args, con: dict, sql_eng: typing.Any) -> typing.List[dict]:
+    """
+    `refresh_segments` целиком: первичная загрузка и пересчеты с изменениями
+    """
+    from segmenter import Segmenter
+
+    segmenter = Segmenter(
+        con,
+        cfg_table=SCHEMA + '.cfg',
+        log_table=SCHEMA + '.log',
+        workers=args.workers,
+        capture=args.capture
+    )
+    params = {
+        'scales': args.scales, 'churns': args.churns, 'workers': args.workers,
+        'capture': args.capture, 'digest': args.digest, 'summary': args.summary
+    }
+    try:
+        initial = timeit(segmenter.refresh_segments, repeat=1)
+        churn = timeit(segmenter.refresh_segments, repeat=args.repeat, setup=lambda: next_run(sql_eng))
+        segmenter.logger.sink.flush()
+        actions = segmenter.logger.metrics.snapshot()
+    finally:
+        segmenter.close()
+
+    return [
+        {'name': 'refresh_segments.initial', 'params': params, **initial},
+        {'name': 'refresh_segments.churn', 'params': params, 'actions': actions, **churn},
+    ]
+
+def bench_refreshers(args, con: dict, sql_eng: typing.Any) -> typing.List[dict]:
+    """
+    `refresh_query` и `refresh_dataframe` по каждому сегменту
+    """
+    from segmenter.modules.refreshers import refresh_dataframe, refresh_query
+    from segmenter.modules.utils import Table
+    from sqlalchemy import text
+
+    def frame(scale: int, churn: float) -> pd.DataFrame:
+        with sql_eng.connect() as _:
+            return pd.read_sql(text(segment_sql(scale, churn)), _)
+
+    results = []
+    for scale in args.scales:
+        for churn in args.churns:
+            table = Table('{}.{}'.format(SCHEMA, segment_name(scale, churn)))
+            params = {'scale': scale, 'churn': churn, 'digest': args.digest, 'summary': args.summary}
+
+            def query() -> None:
+                with sql_eng.begin() as _:
+                    refresh_query(table, segment_sql(scale, churn), _, args.digest, args.summary)
+            results.append({
+                'name': 'refresh_query', 'params': params,
+                **timeit(query, repeat=args.repeat, setup=lambda: next_run(sql_eng))
+            })
+
+            if scale > args.dataframe_limit:
+                continue
+            data = {}
+            def prepare() -> None:
+                next_run(sql_eng)
+                data['frame'] = frame(scale, churn)
+            def dataframe() -> None:
+                with sql_eng.begin() as _:
+                    refresh_dataframe(table, data['frame'], _, args.digest, args.summary)
+            results.append({
+                'name': 'refresh_dataframe', 'params': params,
+                **timeit(dataframe, repeat=args.repeat, setup=prepare)
+            })
+    return results
+
+def bench_checks(args, con: dict, sql_eng: typing.Any) -> typing.List[dict]:
+    """
+    Проверки на `--segments` сегментах
+    """
+    from segmenter.modules.checks import (
+        check_consistency_batch, check_cron, check_cron_batch, check_table
+    )
+    from segmenter.modules.utils import Table, catalog, cron_compile
+
+    crons = ['*/{} * * * *'.format(_ % 59 + 1) for _ in range(args.segments)]
+    data = pd.DataFrame({'refresh_cron': crons})
+    date = datetime.now()
+    with sql_eng.connect() as _:
+        cfg = pd.read_sql('select segment_id, table_name from {}.cfg'.format(SCHEMA), _)
+    cfg = cfg.sample(args.segments, replace=True, random_state=0).reset_index(drop=True)
+    table = Table('{}.{}'.format(SCHEMA, segment_name(args.scales[0], args.churns[0])))
+    params = {'segments': args.segments}
+
+    results = [
+        {'name': 'check_cron', 'params': params, **timeit(
+            lambda: [check_cron(_, date=date) for _ in crons],
+            repeat=args.repeat, setup=cron_compile.cache_clear
+        )},
+        {'name': 'check_cron_batch', 'params': params, **timeit(
+            lambda: check_cron_batch(data, date=date),
+            repeat=args.repeat, setup=cron_compile.cache_clear
+        )},
+    ]
+    with sql_eng.connect() as _:
+        results += [
+            {'name': 'check_consistency_batch', 'params': params, **timeit(
+                lambda: check_consistency_batch(cfg, _), repeat=args.repeat
+            )},
+            {'name': 'check_table.cold', 'params': {}, **timeit(
+                lambda: check_table(_, table), repeat=args.repeat, number=10,
+                setup=catalog.invalidate
+            )},
+            {'name': 'check_table.cached', 'params': {}, **timeit(
+                lambda: check_table(_, table), repeat=args.repeat, number=1000
+            )},
+        ]
+    return results
+
+def bench_logger(args, con: dict, sql_eng: typing.Any) -> typing.List[dict]:
+    """
+    Накладные расходы `Logger.decorate` и пропускная способность `LogSink`
+    """
+    from segmenter.modules.utils import Logger, Table
+    from uuid import uuid4
+    import logging
+
+    @contextmanager
+    def connect(shared: bool = True) -> typing.Generator[typing.Any, typing.Any, None]:
+        if shared:
+            yield None
+        else:
+            with sql_eng.begin() as _:
+                yield _
+
+    def action(segment_id: str, table_name: str, con: typing.Any = None, **kwargs) -> tuple:
+        """
+        Пустое действие
+        """
+        return (result, True)
+
+    result = pd.DataFrame({'id': range(10)})
+    results = []
+    for capture in Logger.CAPTURE:
+        logger = Logger(
+            str(uuid4()), Table(SCHEMA + '.log'), connect=connect,
+            handler=logging.NullHandler(), capture=capture
+        )
+        func = logger.decorate(action)
+        results.append({'name': 'logger.decorate', 'params': {'capture': capture}, **timeit(
+            lambda: func(segment_id=str(uuid4()), table_name='public.test'),
+            repeat=args.repeat, number=args.calls
+        )})
+        logger.close()
+
+    logger = Logger(
+        str(uuid4()), Table(SCHEMA + '.log'), connect=connect,
+        handler=logging.NullHandler()
+    )
+    record = {
+        'processed': datetime.now(), 'id': logger.id, 'action': 'bench',
+        'params': '{}', 'message': 'bench', 'error': None
+    }
+    def sink() -> None:
+        for _ in range(args.calls):
+            logger.sink.put(record)
+        logger.sink.flush()
+    results.append({'name': 'logger.sink', 'params': {'records': args.calls}, **timeit(
+        sink, repeat=args.repeat
+    )})
+    logger.close()
+    return results
+
+def bench_upload(args, con: dict, sql_eng: typing.Any) -> typing.List[dict]:
+    """
+    Выгрузка идентификаторов `HttpTarget` и `AsyncHttpTarget` таргетами в
+    тестовый HTTP сервис
+    """
+    from http_mock import start
+    from segmenter.modules.updaters import targets
+    from segmenter.modules.utils import Logger, Table
+    from uuid import uuid4
+    import asyncio
+    import logging
+
+    server, state = start()
+    logger = Logger(str(uuid4()), Table(SCHEMA + '.log'), handler=logging.NullHandler())
+    ids = pd.Series(range(args.ids)).astype(str)
+    results = []
+    try:
+        for chunksize in args.chunksizes:
+            target = targets['http'](
+                logger, base_url='http://127.0.0.1:{}'.format(server.server_address[1]),
+                chunksize=chunksize, workers=args.upload_workers, rate=None
+            )
+            audience = target.audience(name='bench')
+            results.append({
+                'name': 'upload.update',
+                'params': {'ids': args.ids, 'chunksize': chunksize, 'workers': args.upload_workers},
+                **timeit(lambda: target.update(audience=audience, ids=ids), repeat=args.repeat)
+            })
+            target.close()
+
+            target = targets['http_async'](
+                logger, base_url='http://127.0.0.1:{}'.format(server.server_address[1]),
+                chunksize=chunksize, workers=args.upload_workers, rate=None
+            )
+            async def update() -> None:
+                await target.update(audience=audience, ids=ids)
+                await target.aclose()
+            results.append({
+                'name': 'upload.update_async',
+                'params': {'ids': args.ids, 'chunksize': chunksize, 'workers': args.upload_workers},
+                **timeit(lambda: asyncio.run(update()), repeat=args.repeat)
+            })
+    finally:
+        server.shutdown()
+    return results
+
+def bench_idset(args, con: dict, sql_eng: typing.Any) -> typing.List[dict]:
+    """
+    Память и разность множеств идентификаторов: `object` атрибут против `IdSet`
+    """
+    from segmenter.modules.utils import IdSet
+    import numpy as np
+
+    results = []
+    for scale in args.scales:
+        for churn in args.churns:
+            shift = int(scale * churn)
+            held = pd.Series(np.arange(scale).astype(str), dtype=object)
+            segment = pd.Series(np.arange(shift, scale + shift).astype(str), dtype=object)
+            params = {'scale': scale, 'churn': churn}
+            sets = {}
+
+            def build() -> None:
+                sets['held'], sets['segment'] = IdSet.from_values(held), IdSet.from_values(segment)
+            timing = timeit(build, repeat=args.repeat)
+            results.append({
+                'name': 'idset.build', 'params': params, 'bytes': sets['held'].nbytes, **timing
+            })
+            results.append({
+                'name': 'idset.diff', 'params': params, 'bytes': sets['held'].nbytes,
+                **timeit(lambda: (sets['segment'] - sets['held'], sets['held'] - sets['segment']), repeat=args.repeat)
+            })
+            results.append({
+                'name': 'idset.diff_pandas', 'params': params, 
+                'bytes': held.memory_usage(index=False, deep=True),
+                **timeit(lambda: (segment[~segment.isin(held)], held[~held.isin(segment)]), repeat=args.repeat)
+            })
+    return results
+
+def bench_hashing(args, con: dict, sql_eng: typing.Any) -> typing.List[dict]:
+    """
+    Нормализация и хэширование адресов почты `Hasher`
+    """
+    from segmenter.modules.utils import Hasher
+    from sqlalchemy import text
+
+    with sql_eng.begin() as _:
+        _.execute(text(
+            open(ROOT / 'segmenter' / '__tables__' / 'segmenter_hashes.sql').read()
+            .replace('public.segmenter_hashes', SCHEMA + '.hashes')
+        ))
+    emails = pd.Series([' User{}@Example.com'.format(_) for _ in range(args.ids)])
+    params = {'ids': args.ids, 'workers': args.workers}
+    results = []
+
+    hasher = Hasher('email', workers=args.workers, cache_size=0)
+    results.append({'name': 'hashing.cold', 'params': params, **timeit(
+        lambda: hasher(emails), repeat=args.repeat
+    )})
+    hasher.close()
+    hasher = Hasher('email', workers=args.workers)
+    hasher(emails)
+    results.append({'name': 'hashing.memory', 'params': params, **timeit(
+        lambda: hasher(emails), repeat=args.repeat
+    )})
+    hasher.close()
+    with sql_eng.begin() as _:
+        Hasher('email', table=SCHEMA + '.hashes', workers=args.workers)(emails, _)
+    def stored() -> None:
+        with sql_eng.connect() as _:
+            Hasher('email', table=SCHEMA + '.hashes', workers=args.workers)(emails, _)
+    results.append({'name': 'hashing.table', 'params': params, **timeit(
+        stored, repeat=args.repeat
+    )})
+    return results
+
+BENCHMARKS = {
+    'refresh': bench_refresh,
+    'refreshers': bench_refreshers,
+    'checks': bench_checks,
+    'logger': bench_logger,
+    'upload': bench_upload,
+    'idset': bench_idset,
+    'hashing': bench_hashing,
+}
+""" Группы замеров """
+
+def main() -> None:
+    parser = ArgumentParser(description='Бенчмарки сегментера')
+    parser.add_argument('con', help='путь к JSON файлу с параметрами подключения')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000000])
+    parser.add_argument('--churns', type=float, nargs='+', default=[0.01, 0.1])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--capture', choices=('off', 'summary', 'full'), default='full')
+    parser.add_argument('--digest', action='store_true')
+    parser.add_argument('--summary', choices=('ids', 'counts', 'sets'), default='counts')
+    parser.add_argument('--segments', type=int, default=1000)
+    parser.add_argument('--calls', type=int, default=1000)
+    parser.add_argument('--ids', type=int, default=1000000)
+    parser.add_argument('--chunksizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--upload-workers', type=int, default=4)
+    parser.add_argument('--dataframe-limit', type=int, default=10000000,
+        help='максимальный размер сегмента для замера refresh_dataframe')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--keep', action='store_true', help='не удалять схему по завершении')
+    parser.add_argument('--output', help='путь к JSON файлу с результатами')
+    args = parser.parse_args()
+
+    from sqlalchemy import create_engine, text
+
+    con = load_con(args.con)
+    sql_eng = create_engine(url(con))
+    result = {'environment': environment(sql_eng), 'results': []}
+
+    setup(sql_eng, args.scales, args.churns, args.digest, args.summary)
+    try:
+        for name in args.only:
+            for _ in BENCHMARKS[name](args, con, sql_eng):
+                result['results'].append(_)
+                print('{name:<28} {params} median={median:.6f}s'.format(**_) + (
+                    ' bytes={}'.format(_['bytes']) if 'bytes' in _ else ''
+                ))
+    finally:
+        if not args.keep:
+            with sql_eng.begin() as _:
+                _.execute(text('drop schema if exists {} cascade'.format(SCHEMA)))
+        sql_eng.dispose()
+
+    save(result, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -7,4 +7,17 @@
 и удаление пользовательских сегментов.
 
 """
-from .segmenter import Segmenter
\ No newline at end of file
+import typing
+
+if typing.TYPE_CHECKING:
+    from .segmenter import Segmenter
+
+def __getattr__(name: str) -> typing.Any:
+    """
+    Отложенный импорт Сегментера: pandas, SQLAlchemy и модули проверок
+    загружаются при первом обращении к `Segmenter`, а не при импорте пакета
+    """
+    if name == 'Segmenter':
+        from .segmenter import Segmenter
+        return Segmenter
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,46 @@
+"""
+Запуск сегментера в резидентном режиме
+======================================
+
+    python -m segmenter con.json [--cfg-table segmenter] [--workers 4]
+
+Файл con.json содержит `dict` представление подключения к хранилищу вида
+{"driver": "postgresql", "login": "логин", "password": "пароль", ...}, файл
+--consumers – параметры таргетов потребителей вида
+{"идентификатор потребителя": {"таргет": {"base_url": "...", "rate": 10, ...}}}.
+
+"""
+from .segmenter import Segmenter
+from argparse import ArgumentParser
+from json import load
+
+def main() -> None:
+    parser = ArgumentParser(prog='segmenter', description='Резидентный режим сегментера')
+    parser.add_argument('con', help='путь к JSON файлу с параметрами подключения')
+    parser.add_argument('--cfg-table', default='segmenter')
+    parser.add_argument('--log-table', default='segmenter_log')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--interval', type=float, default=300)
+    parser.add_argument('--metrics', help='путь к файлу метрик в формате Prometheus')
+    parser.add_argument('--consumers', help='путь к JSON файлу с параметрами таргетов потребителей')
+    parser.add_argument('--capture', choices=('off', 'summary', 'full'), default='full')
+    args = parser.parse_args()
+
+    with open(args.con) as f:
+        con = load(f)
+    consumers = {}
+    if args.consumers:
+        with open(args.consumers) as f:
+            consumers = load(f)
+
+    Segmenter(
+        con,
+        cfg_table=args.cfg_table,
+        log_table=args.log_table,
+        consumers=consumers,
+        workers=args.workers,
+        capture=args.capture
+    ).serve(interval=args.interval, metrics=args.metrics)
+
+if __name__ == '__main__':
+    main()
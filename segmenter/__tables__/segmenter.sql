@@ -18,11 +18,14 @@ select base.id
 	 , base.refresh_auto
 	 , base.refresh_params
 	 , base.refresh_cron
+	 , base.refresh_depends
 	 , subs.consumer_id as update_consumer
 	 , subs.target as update_target
 	 , subs.name as update_name
 	 , subs.params as update_params
      , subs.cron as update_cron
+	 , subs.synced as update_synced
+	 , greatest(segm.updated_at, subs.updated_at) as updated
 from segmenter_segments segm
 left join actual_subscriptions subs on segm.id = subs.segment_id and subs.actual_end = 'infinity'
 left join segmenter_log on false
@@ -39,8 +42,11 @@ comment on column public.segmenter.context          is 'Связанная за
 comment on column public.segmenter.refresh_auto     is 'Является ли сегмент автообновляемым: "false" – для обновляемых вручную, "true" – для автообновляемых';
 comment on column public.segmenter.refresh_params   is 'Параметры создания или пересчета сегмента: "query" – запрос для пересчета сегмента, "procedure" – наименование функции пересчета сегмента';
 comment on column public.segmenter.refresh_cron     is 'CRON-расписание пересчета сегмента';
+comment on column public.segmenter.refresh_depends  is 'Идентификаторы сегментов, пересчитываемых перед данным';
 comment on column public.segmenter.update_consumer  is 'Идентификатор потребителя';
 comment on column public.segmenter.update_target    is 'Целевая система';
 comment on column public.segmenter.update_name      is 'Наименование аудитории';
 comment on column public.segmenter.update_params    is 'Параметры обновления аудитории';
-comment on column public.segmenter.update_cron      is 'CRON-расписание обновления аудитории';
\ No newline at end of file
+comment on column public.segmenter.update_cron      is 'CRON-расписание обновления аудитории';
+comment on column public.segmenter.update_synced    is 'Отметка последней успешной синхронизации аудитории';
+comment on column public.segmenter.updated          is 'Момент последнего изменения записи';
\ No newline at end of file
@@ -0,0 +1,21 @@
+/*
+	Таблица "segmenter_hashes" – кэш хэшей контактов: хэши нормализованных 
+	значений по их 64-битным отпечаткам (см. utils.hashing.Hasher).
+*/
+
+drop table if exists public.segmenter_hashes;
+create table public.segmenter_hashes (
+	kind 			varchar 	not null,
+	"algorithm" 	varchar 	not null,
+	fingerprint 	bigint 		not null,
+	hash 			varchar 	not null,
+	created 		timestamp 	not null 	default now(),
+	constraint segmenter_hashes_pkey primary key (kind, "algorithm", fingerprint)
+);
+
+comment on table public.segmenter_hashes                is 'Кэш хэшей контактов';
+comment on column public.segmenter_hashes.kind          is 'Тип значений и параметры нормализации';
+comment on column public.segmenter_hashes.algorithm     is 'Алгоритм хэширования';
+comment on column public.segmenter_hashes.fingerprint   is 'Отпечаток нормализованного значения (pandas.util.hash_array)';
+comment on column public.segmenter_hashes.hash          is 'Хэш нормализованного значения';
+comment on column public.segmenter_hashes.created       is 'Момент добавления записи';
@@ -17,8 +17,15 @@ create table public.segmenter_log (
 	num_received 		int 		null,
 	num_invalid 		int 		null,
 	contact 			varchar 	null,
+	params 				varchar 	null,
+	message 			varchar 	null,
 	error 				varchar 	null,
-	existed 			boolean 	null
+	existed 			boolean 	null,
+	duration 			double precision null,
+	db_duration 		double precision null,
+	db_queries 			int 		null,
+	db_rows 			bigint 		null,
+	"rows" 				bigint 		null
 );
 
 comment on table public.segmenter_log               is 'Логовая таблица';
@@ -28,4 +35,12 @@ comment on column public.segmenter_log.target       is 'Целевая сист
 comment on column public.segmenter_log.id           is 'Идентификатор сегмента';
 comment on column public.segmenter_log.segment_id   is 'Идентификатор сегмента на стороне клиента';
 comment on column public.segmenter_log.segment_name is 'Наименование сегмента на стороне клиента';
-comment on column public.segmenter_log.coverage     is 'Размер аудитории';
\ No newline at end of file
+comment on column public.segmenter_log.coverage     is 'Размер аудитории';
+comment on column public.segmenter_log.params       is 'Параметры вызова действия';
+comment on column public.segmenter_log.message      is 'Сообщение о результате действия';
+comment on column public.segmenter_log.error        is 'Трассировка ошибки действия';
+comment on column public.segmenter_log.duration     is 'Время выполнения действия, с';
+comment on column public.segmenter_log.db_duration  is 'Время запросов действия к хранилищу, с';
+comment on column public.segmenter_log.db_queries   is 'Количество запросов действия к хранилищу';
+comment on column public.segmenter_log.db_rows      is 'Количество затронутых запросами действия строк';
+comment on column public.segmenter_log.rows         is 'Размер результата действия';
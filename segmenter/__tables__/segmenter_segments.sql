@@ -15,9 +15,27 @@ create table public.segmenter_segments (
 	refresh_auto 	bool 		not null 	default false,
 	refresh_params 	json 		null 		default '{}'::json,
 	refresh_cron 	varchar 	null,
+	refresh_depends varchar[] 	null,
+	updated_at 		timestamp 	not null 	default clock_timestamp(),
 	constraint segmenter_segments_pkey primary key (id)
 );
 
+/*
+	Момент изменения записи обновляется при любом ее изменении – по нему 
+	Сегментер перечитывает только измененные сегменты (см. Segmenter.reload).
+*/
+create or replace function public.segmenter_touch() returns trigger as $$
+begin
+	new.updated_at = clock_timestamp();
+	return new;
+end;
+$$ language plpgsql;
+
+create trigger segmenter_segments_touch
+before update on public.segmenter_segments
+for each row when (old::text is distinct from new::text)
+execute function public.segmenter_touch();
+
 comment on table public.segmenter_segments                  is 'Таблица сегментов'; 
 comment on column public.segmenter_segments.id              is 'Суррогатный первичный ключ, некоторый случайно сгенерированный идентификатор';
 comment on column public.segmenter_segments.name            is 'Наименование сегмента';
@@ -27,5 +45,7 @@ comment on column public.segmenter_segments.context         is 'Связанна
 comment on column public.segmenter_segments.actual_begin    is 'Дата заведения сегмента';
 comment on column public.segmenter_segments.actual_end      is 'Актуальность сегмента';
 comment on column public.segmenter_segments.refresh_auto    is 'Является ли сегмент автообновляемым: "false" – для обновляемых вручную, "true" – для автообновляемых';
-comment on column public.segmenter_segments.refresh_params  is 'Параметры создания или пересчета сегмента: "query" – запрос для пересчета сегмента, "procedure" – наименование функции пересчета сегмента';
-comment on column public.segmenter_segments.refresh_cron    is 'CRON-расписание пересчета сегмента';
\ No newline at end of file
+comment on column public.segmenter_segments.refresh_params  is 'Параметры создания или пересчета сегмента: "query" – запрос для пересчета сегмента, "procedure" – наименование функции пересчета сегмента; параметр "sources" рефрешера – таблицы источников сегмента (см. checks.check_sources)';
+comment on column public.segmenter_segments.refresh_cron    is 'CRON-расписание пересчета сегмента';
+comment on column public.segmenter_segments.refresh_depends is 'Идентификаторы сегментов, пересчитываемых перед данным';
+comment on column public.segmenter_segments.updated_at      is 'Момент последнего изменения записи';
@@ -0,0 +1,19 @@
+/*
+	Таблица "segmenter_sources" – отпечатки таблиц источников сегментов на 
+	момент их последнего пересчета (см. checks.check_sources).
+*/
+
+drop table if exists public.segmenter_sources;
+create table public.segmenter_sources (
+	segment_id 		uuid 		not null,
+	"source" 		varchar 	not null,
+	fingerprint 	varchar 	null,
+	processed 		timestamp 	not null 	default now(),
+	constraint segmenter_sources_pkey primary key (segment_id, "source")
+);
+
+comment on table public.segmenter_sources                 is 'Отпечатки таблиц источников сегментов';
+comment on column public.segmenter_sources.segment_id     is 'Идентификатор сегмента';
+comment on column public.segmenter_sources.source         is 'Таблица источника в формате "схема.таблица"';
+comment on column public.segmenter_sources.fingerprint    is 'Отпечаток источника: максимальное значение водяного знака или счетчики изменений таблицы';
+comment on column public.segmenter_sources.processed      is 'Момент пересчета сегмента';
@@ -13,10 +13,24 @@ create table public.segmenter_subscriptions (
 	params 			json 		not null 	default '{}'::json,
 	cron 			varchar 	null,
 	status 			varchar 	not null 	default 'not uploaded',
+	synced 			timestamp 	null,
 	actual_begin 	timestamp 	not null 	default now(),
-	actual_end 		timestamp 	not null 	default 'infinity'::timestamp
+	actual_end 		timestamp 	not null 	default 'infinity'::timestamp,
+	updated_at 		timestamp 	not null 	default clock_timestamp()
 );
 
+/*
+	Момент изменения записи обновляется при изменении параметров подписки – 
+	но не статуса и отметки синхронизации, которые Сегментер обновляет при 
+	каждой выгрузке (см. Segmenter.reload). Функция segmenter_touch создается 
+	вместе с таблицей segmenter_segments.
+*/
+create trigger segmenter_subscriptions_touch
+before update of consumer_id, segment_id, target, "name", params, cron, actual_begin, actual_end
+on public.segmenter_subscriptions
+for each row when (old::text is distinct from new::text)
+execute function public.segmenter_touch();
+
 comment on table public.segmenter_subscriptions                 is 'Таблица подписок';
 comment on column public.segmenter_subscriptions.consumer_id    is 'Идентификатор потребителя';
 comment on column public.segmenter_subscriptions.segment_id     is 'Идентификатор сегмента';
@@ -25,5 +39,7 @@ comment on column public.segmenter_subscriptions.name           is 'Наимен
 comment on column public.segmenter_subscriptions.params         is 'Параметры обновления аудитории';
 comment on column public.segmenter_subscriptions.cron           is 'CRON-расписание обновления аудитории';
 comment on column public.segmenter_subscriptions.status         is 'Статус обновления';
+comment on column public.segmenter_subscriptions.synced         is 'Отметка (processed сегмента) последней успешной синхронизации аудитории';
 comment on column public.segmenter_subscriptions.actual_begin   is 'Дата заведения сегмента';
-comment on column public.segmenter_subscriptions.actual_end     is 'Актуальность сегмента';
\ No newline at end of file
+comment on column public.segmenter_subscriptions.actual_end     is 'Актуальность сегмента';
+comment on column public.segmenter_subscriptions.updated_at     is 'Момент последнего изменения параметров подписки';
@@ -6,11 +6,17 @@
     consistency – проверка соответствия конфигурационному файлу
     cron – проверка готовности по CRON-расписанию
     relevance - проверка актуальности сегмента
+    sources – проверка изменения и прогруженности источников
     table – проверка доступности коллекции
 
+Проверка, имеющая пакетный вариант – функцию с суффиксом "_batch", принимающую
+датафрейм сегментов и возвращающую серию результатов, – выполняется Сегментером 
+для всех сегментов одним вызовом пакетного варианта.
+
 """
 
-from .cron import check_cron
+from .cron import check_cron, check_cron_batch
 from .table import check_table
-from .consistency import check_consistency
-# from .relevance import check_relevance
\ No newline at end of file
+from .consistency import check_consistency, check_consistency_batch
+# from .relevance import check_relevance
+from .sources import check_sources
\ No newline at end of file
@@ -1,3 +1,4 @@
+from ..utils.sql import read_frame
 from ..utils.table import Table
 from datetime import datetime
 from sqlalchemy import engine
@@ -23,15 +24,63 @@ def check_consistency(
         ...
 
     """
-    data = pd.read_sql("""
+    data = read_frame("""
         select 'test_segment' as segment_name
             , '{segment_id}' as segment_id
             , '{segment_id}' as segmenter_id
-            , case when count(*) = 0 then false else true end as consistent
-        from {table_name}
-        where true
-            and segment_id = '{segment_id}'
-            and actual_end = 'infinity';
+            , exists (
+                select 1
+                from {table_name}
+                where true
+                    and segment_id = '{segment_id}'
+                    and actual_end = 'infinity'
+            ) as consistent;
     """.format(segment_id=segment_id, table_name=table_name), con)
 
-    return (data.iloc[0], data.iloc[0].consistent)
\ No newline at end of file
+    return (data.iloc[0], data.iloc[0].consistent)
+
+def check_consistency_batch(
+    data: pd.DataFrame,
+    con: engine.Connection,
+    **kwargs
+) -> typing.Tuple[pd.DataFrame, pd.Series]:
+    """
+    Проверка соответствия сегментов конфигурационному файлу
+    =======================================================
+
+    Декорируется `logger.decorate(...)` методом в рамках работы Сегментера.
+
+    Пакетный вариант `check_consistency` проверки: согласованность всех 
+    переданных сегментов проверяется одним запросом – по `exists` пробе на 
+    каждый сегмент вместо подсчета его записей.
+
+    Аргументы:
+        data (pd.DataFrame): сегменты с атрибутами `segment_id`, `table_name`
+        con (sqlalchemy.engine.Connection): активное подключение к хранилищу
+
+    Возвращает:
+        ...
+
+    """
+    if data.empty:
+        return (pd.DataFrame(columns=['segment_id', 'consistent']), pd.Series(dtype=bool))
+
+    result = read_frame('\n union all \n'.join(
+        """
+        select '{segment_id}' as segment_id
+            , exists (
+                select 1
+                from {table_name}
+                where true
+                    and segment_id = '{segment_id}'
+                    and actual_end = 'infinity'
+            ) as consistent
+        """.format(segment_id=segment_id, table_name=table_name)
+            for segment_id, table_name in data[['segment_id', 'table_name']].drop_duplicates(
+                subset='segment_id'
+            ).itertuples(index=False)
+    ) + ';', con)
+
+    return (result, data.segment_id.astype(str).map(
+        result.set_index('segment_id').consistent
+    ).fillna(False).astype(bool))
\ No newline at end of file
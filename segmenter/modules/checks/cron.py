@@ -1,11 +1,12 @@
-from cron_converter import Cron
+from ..utils.cron import cron_evaluate
 from datetime import datetime
 import pandas as pd
 import typing
 
 def check_cron(
     refresh_cron:str,
-    date:datetime = datetime.now().replace(microsecond=0, tzinfo=None),
+    date: typing.Union[datetime, None] = None,
+    since: typing.Union[datetime, None] = None,
     **kwargs
 ) -> typing.Tuple[pd.Series, typing.Union[bool, None]]:
     """
@@ -14,16 +15,44 @@ def check_cron(
 
     Декорируется `logger.decorate(...)` методом в рамках работы Сегментера.
 
+    Аргументы:
+        refresh_cron (str): CRON-расписание пересчета сегмента
+        date (datetime): момент проверки, по умолчанию – текущий
+        since (datetime): момент предыдущей проверки (см. `utils.cron_evaluate`)
+
     Возвращает:
         ...
 
     """
-    cron_prev = Cron(refresh_cron).schedule().prev().replace(microsecond=0, tzinfo=None)
-    cron_next = Cron(refresh_cron).schedule().next().replace(microsecond=0, tzinfo=None)
-
-    return (pd.DataFrame([{
-        'refresh_date': cron_prev,
-        'refresh_cron': refresh_cron,
-        'current_date': date,
-        'refresh': cron_prev <= date < cron_next,
-    }]).iloc[0], cron_prev <= date < cron_next)
\ No newline at end of file
+    data = cron_evaluate(pd.Series([refresh_cron]), date, since).iloc[0]
+
+    return (data, bool(data.refresh))
+
+def check_cron_batch(
+    data: pd.DataFrame,
+    date: typing.Union[datetime, None] = None,
+    since: typing.Union[datetime, pd.Series, None] = None,
+    **kwargs
+) -> typing.Tuple[pd.DataFrame, pd.Series]:
+    """
+    Проверка готовности сегментов по CRON-расписаниям
+    =================================================
+
+    Декорируется `logger.decorate(...)` методом в рамках работы Сегментера.
+
+    Пакетный вариант `check_cron` проверки: рассчитывает готовность всех 
+    переданных сегментов одним вызовом.
+
+    Аргументы:
+        data (pd.DataFrame): сегменты с атрибутом `refresh_cron`
+        date (datetime): момент проверки, по умолчанию – текущий
+        since (datetime): момент предыдущей проверки – общий или серия с
+            индексом `data` (см. `utils.cron_evaluate`)
+
+    Возвращает:
+        ...
+
+    """
+    data = cron_evaluate(data.refresh_cron, date, since)
+
+    return (data, data.refresh)
\ No newline at end of file
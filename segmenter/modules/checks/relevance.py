@@ -1,3 +1,4 @@
+from ..utils.sql import read_frame
 from datetime import datetime
 from sqlalchemy import engine
 import pandas as pd
@@ -18,7 +19,7 @@ def check_relevance(
         ...
 
     """
-    data = pd.read_sql("""
+    data = read_frame("""
         select case when count(*) = 1 then true else false end as relevance 
         from segmenter_log sl 
         where true 
@@ -27,6 +28,6 @@ def check_relevance(
             and "action" != 'refresh_segments'
             and error is null
         ;
-    """.format(segment_id=segment_id), con=con)
+    """.format(segment_id=segment_id), con)
 
     return (data, data.iloc[0].relevance)
\ No newline at end of file
@@ -0,0 +1,148 @@
+from ..utils.metadata import catalog
+from ..utils.sql import read_frame
+from ..utils.table import Table
+from sqlalchemy import engine, text
+import pandas as pd
+import typing
+
+_loading = ('ExclusiveLock', 'AccessExclusiveLock')
+""" Блокировки таблицы, означающие ее прогрузку (lock table, truncate, refresh
+materialized view и т.д.), – в отличие от блокировок обычной записи """
+
+def check_sources(
+    segment_id: str,
+    refresh_params: dict,
+    con: engine.Connection,
+    sources_table: typing.Union[Table, None] = None,
+    **kwargs
+) -> typing.Tuple[pd.DataFrame, typing.Union[bool, None]]:
+    """
+    Проверка изменения и прогруженности источников
+    ==============================================
+
+    Декорируется `logger.decorate(...)` методом в рамках работы Сегментера.
+
+    Источники сегмента перечисляются `sources` параметром рефрешера – списком
+    таблиц или словарем вида {таблица: атрибут-водяной знак}, например:
+        {"query": {"sql": "...", "sources": {"public.orders": "updated_at",
+            "public.clients": null}}}
+    Сегмент без источников пересчитывается всегда. Параметр `loader` –
+    шаблон `application_name` сеансов загрузчика (`like` выражение, например
+    "etl%").
+
+    Отпечаток источника – максимальное значение водяного знака или, при его
+    отсутствии, счетчики вставленных, измененных и удаленных записей таблицы
+    и ее секций (`pg_stat_user_tables`) вместе с их файлами (`relfilenode`
+    меняется при truncate). Счетчики обновляются с задержкой: начиная с
+    PostgreSQL 15 сеанс сбрасывает накопленную статистику не при фиксации
+    транзакции, а примерно через 10–60 секунд после нее. У представлений
+    счетчиков нет – для них отпечаток не определяется, если не задан водяной
+    знак.
+
+    Проверка не пройдена, если:
+    *   источник прогружается – другой сеанс удерживает исключительную
+            блокировку таблицы или ее секции (см. `_loading`) или сеанс
+            загрузчика (`loader`) удерживает любую ее блокировку: пересчет
+            откладывается до завершения прогрузки,
+    *   отпечатки всех источников определены и совпадают с сохраненными в
+            `sources_table` при предыдущем пересчете: пересчет пропускается.
+    Отложенные и пропущенные сегменты повторно проверяются при следующем
+    пересчете резидентного режима (см. `Segmenter.serve`), в том числе после
+    запоздалого обновления счетчиков. Иначе новые отпечатки сохраняются в
+    `sources_table` в транзакции пересчета сегмента (см.
+    `Segmenter.refresh_segments`) – и откатываются вместе с ней в случае
+    ошибки рефрешера.
+
+    Аргументы:
+        segment_id (str): идентификатор сегмента
+        refresh_params (dict): параметры пересчета сегмента
+        con (sqlalchemy.engine.Connection): активное подключение к хранилищу
+        sources_table (Table): таблица отпечатков источников (см.
+            `__tables__/segmenter_sources.sql`), при ее отсутствии отпечатки
+            не сохраняются и сегмент пересчитывается всегда
+
+    Возвращает:
+        ...
+
+    """
+    params = next(iter((refresh_params or {}).values()), None) or {}
+    sources = params.get('sources') or {}
+    if not isinstance(sources, dict):
+        sources = dict.fromkeys(sources)
+    if not sources:
+        return (pd.DataFrame(columns=['source', 'fingerprint', 'loading']), True)
+
+    data = read_frame("""
+        with _sources as (
+            select _.source, to_regclass(_.source) as relid
+            from unnest(cast(:sources as text[])) as _(source)
+        ), _relations as (
+            select s.source, c.oid, c.relkind, c.relfilenode
+            from _sources s
+            join pg_catalog.pg_class c
+                on c.oid = s.relid or c.oid in (select relid from pg_partition_tree(s.relid))
+        )
+        select s.source
+            , (
+                select case when bool_and(t.relid is not null or r.relkind = 'p') then
+                    string_agg(concat_ws(':', r.oid, r.relfilenode, t.n_tup_ins, t.n_tup_upd, t.n_tup_del), ',' order by r.oid)
+                end
+                from _relations r
+                left join pg_catalog.pg_stat_all_tables t on t.relid = r.oid
+                where r.source = s.source and r.relkind in ('r', 'p', 'm')
+            ) as fingerprint
+            , exists (
+                select 1
+                from pg_catalog.pg_locks l
+                join _relations r on r.oid = l.relation
+                where true
+                    and r.source = s.source
+                    and l.pid <> pg_backend_pid()
+                    and l.granted
+                    and (l.mode in :loading or l.pid in (
+                        select pid
+                        from pg_catalog.pg_stat_activity
+                        where application_name like :loader
+                    ))
+            ) as loading
+        from _sources s;
+    """, con, {
+        'sources': [*map(str, sources)],
+        'loading': _loading,
+        'loader': params.get('loader')
+    })
+
+    ### Чтение прогружаемого источника ожидало бы завершения прогрузки
+    if data.loading.any():
+        return (data, False)
+
+    for source, column in sources.items():
+        if column:
+            data.loc[data.source == str(source), 'fingerprint'] = '{}:{}'.format(
+                column,
+                con.execute(text('select max({})::text from {};'.format(column, source))).scalar()
+            )
+    if not sources_table or not catalog.exists(sources_table, con):
+        return (data, True)
+
+    stored = read_frame("""
+        select source, fingerprint
+        from {}
+        where segment_id::text = :segment_id;
+    """.format(sources_table), con, {'segment_id': str(segment_id)})
+    if data.fingerprint.notna().all() and \
+        stored.set_index('source').fingerprint.to_dict() == data.set_index('source').fingerprint.to_dict():
+        return (data, False)
+
+    con.execute(text("""
+        delete from {table} where segment_id::text = :segment_id;
+        insert into {table} (segment_id, source, fingerprint)
+        select cast(:segment_id as uuid), _.source, _.fingerprint
+        from unnest(cast(:sources as text[]), cast(:fingerprints as text[])) as _(source, fingerprint);
+    """.format(table=sources_table)), {
+        'segment_id': str(segment_id),
+        'sources': data.source.tolist(),
+        'fingerprints': data.fingerprint.where(data.fingerprint.notna(), None).tolist()
+    })
+
+    return (data, True)
@@ -1,3 +1,5 @@
+from ..utils.metadata import catalog
+from ..utils.sql import read_frame
 from ..utils.table import Table
 from sqlalchemy import engine
 import pandas as pd
@@ -15,6 +17,10 @@ def check_table(
 
     Декорируется `logger.decorate(...)` методом в рамках работы Сегментера.
 
+    Наличие и перечень атрибутов коллекции определяются по системному каталогу
+    хранилища (см. `utils.catalog`) без обращения к ее данным; данные 
+    читаются только при `get_data`.
+
     Аргументы:
         table (str): коллекция данных
         get_data (bool): необходимо ли возвращать записи или же достаточно лишь
@@ -25,14 +31,9 @@ def check_table(
         ...
     
     """
-    params = {
-        'sql': 'select * from {};'.format(table_name),
-        'con': con
-    }
-    
     if get_data == True:
-        data = pd.read_sql(**params)
+        table_name.data = read_frame('select * from {};'.format(table_name), con)
     else:
-        data = next(pd.read_sql(**params, chunksize=0))
+        table_name.data = catalog.frame(table_name, con)
 
-    return (table_name.data, False if table_name.data is None else True)
\ No newline at end of file
+    return (table_name.data, catalog.exists(table_name, con))
\ No newline at end of file
@@ -2,7 +2,15 @@
 Рефрешеры
 =========
 
+Модуль содержит набор следующих рефрешеров сегментера:
+    composite – пересчет сегмента как выражения над другими сегментами
+    dataframe – пересчет сегмента по сформированному в Python датафрейму
+    procedure – процедурный пересчет сегмента
+    query – пересчет сегмента по запросу
+
 """
 
+from .composite import refresh_composite
+from .dataframe import refresh_dataframe
 from .procedure import refresh_procedure
 from .query import refresh_query
\ No newline at end of file
@@ -0,0 +1,230 @@
+from ..utils import Table, catalog
+from .merge import _service, merge, summarize
+from sqlalchemy import engine, text
+import pandas as pd
+import re
+import typing
+
+_tokens = re.compile(r'\s*(?:([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)?)|([|&()-]))')
+""" Лексемы выражения: наименование таблицы ('схема.таблица') или оператор """
+
+_operators = {'|': 'union', '&': 'intersect', '-': 'except'}
+""" Операторы выражения и соответствующие им операции над запросами """
+
+def parse(expression: str) -> tuple:
+    """
+    Разбор выражения над сегментами
+    ===============================
+
+    Выражение составляется из наименований сегментных таблиц, операторов `|`
+    (объединение), `&` (пересечение), `-` (разность) и скобок. Пересечение
+    выполняется раньше объединения и разности, операторы одного приоритета –
+    слева направо: `a | b & c - d` = `(a | (b & c)) - d`.
+
+    Возвращает:
+        tuple: дерево выражения – (Table,) для таблицы или (оператор, левый
+            операнд, правый операнд)
+
+    """
+    tokens, position = [], 0
+    expression = str(expression).rstrip()
+    while position < len(expression):
+        match = _tokens.match(expression, position)
+        if not match:
+            raise ValueError(
+                'Некорректное выражение {!r} в позиции {}'.format(expression, position)
+            )
+        tokens.append(match.group(1) and Table(match.group(1)) or match.group(2))
+        position = match.end()
+
+    def _take(expected: typing.Union[str, None] = None) -> typing.Any:
+        token = tokens.pop(0) if tokens else None
+        if expected and token != expected:
+            raise ValueError('Ожидается {!r} в выражении {!r}'.format(expected, expression))
+        return token
+
+    def _operand() -> tuple:
+        token = _take()
+        if token == '(':
+            node = _expression()
+            _take(')')
+            return node
+        if not isinstance(token, Table):
+            raise ValueError('Ожидается таблица в выражении {!r}'.format(expression))
+        return (token,)
+
+    def _intersection() -> tuple:
+        node = _operand()
+        while tokens and tokens[0] == '&':
+            node = (_take(), node, _operand())
+        return node
+
+    def _expression() -> tuple:
+        node = _intersection()
+        while tokens and tokens[0] in ('|', '-'):
+            node = (_take(), node, _intersection())
+        return node
+
+    node = _expression()
+    if tokens:
+        raise ValueError('Лишние лексемы в выражении {!r}: {}'.format(expression, tokens))
+    return node
+
+def operands(expression: typing.Union[str, tuple]) -> typing.List[Table]:
+    """
+    Сегментные таблицы выражения – без повторов, в порядке упоминания
+    """
+    node = parse(expression) if isinstance(expression, str) else expression
+    if len(node) == 1:
+        return [node[0]]
+    return [*dict.fromkeys((*operands(node[1]), *operands(node[2])))]
+
+def _ids(node: tuple) -> str:
+    """
+    Запрос идентификаторов выражения над актуальными записями сегментов
+    """
+    if len(node) == 1:
+        return "select id from {} where actual_end = 'infinity' and id is not null".format(node[0])
+    return '({}) {} ({})'.format(_ids(node[1]), _operators[node[0]], _ids(node[2]))
+
+def depends(segments: pd.DataFrame) -> typing.Dict[str, typing.List[str]]:
+    """
+    Зависимости составных сегментов
+    ===============================
+
+    Аргументы:
+        segments (pd.DataFrame): конфигурация сегментов с атрибутами
+            `segment_id`, `table_name` и `refresh_params`
+
+    Возвращает:
+        dict: идентификаторы сегментов, чьи таблицы входят в выражение
+            составного сегмента, вида {сегмент: [сегменты]}; операнды, не
+            являющиеся таблицами сегментов конфигурации, не учитываются
+
+    """
+    tables = {
+        str(_['table_name']): str(_['segment_id'])
+            for _ in segments.to_dict('records') if _['table_name']
+    }
+    result = {}
+    for segment in segments.to_dict('records'):
+        params = (segment['refresh_params'] or {}).get('composite')
+        if not params:
+            continue
+        try:
+            result[str(segment['segment_id'])] = [
+                tables[str(_)] for _ in operands(params['expression']) if str(_) in tables
+            ]
+        except (KeyError, ValueError):
+            ### Ошибка выражения фиксируется при пересчете сегмента
+            result[str(segment['segment_id'])] = []
+    return result
+
+def circular(depends: typing.Dict[str, typing.Iterable[str]]) -> typing.Set[str]:
+    """
+    Сегменты с циклическими определениями
+    =====================================
+
+    Возвращает:
+        set: сегменты, входящие в цикл зависимостей (в том числе ссылающиеся
+            на себя) или зависящие от такого сегмента
+
+    """
+    resolved, pending = set(), {k: {*v} & depends.keys() for k, v in depends.items()}
+    while pending:
+        ready = {k for k, v in pending.items() if v <= resolved}
+        if not ready:
+            break
+        resolved |= ready
+        pending = {k: v for k, v in pending.items() if k not in ready}
+    return {*pending}
+
+def refresh_composite(
+    table_name: Table,
+    expression: str,
+    con: engine.Connection,
+    digest: bool = False,
+    summary: str = 'ids',
+    segment_id: typing.Union[str, None] = None,
+    **kwargs
+) -> typing.Tuple[pd.DataFrame, typing.Union[bool, None]]:
+    """
+    Пересчет составного сегмента
+    ============================
+
+    Декорируется `logger.decorate(...)` методом в рамках работы Сегментера.
+
+    Функция пересчитывает сегмент как выражение над актуальными
+    (`actual_end = 'infinity'`) записями других сегментных таблиц, например
+    "(public.seg_a | seg_c) - seg_b" (см. `parse`), – в хранилище, без
+    повторного выполнения запросов сегментов-операндов. Атрибуты записи
+    берутся из первого по порядку упоминания операнда, содержащего ее
+    идентификатор; отсутствующие в операнде атрибуты – пустые, `segment_id`
+    – идентификатор пересчитываемого сегмента. Результат сливается с
+    сегментом по SCD2 схеме (см. `merge`).
+
+    Сегменты-операнды пересчитываются раньше составного сегмента (см.
+    `Segmenter.refresh_segments`), циклические определения не пересчитываются.
+
+    Аргументы:
+        table_name (Table): сегментная таблица
+        expression (str): выражение над сегментными таблицами
+        сon (sqlalchemy.engine.Connection): SQLalchemy подключение
+        digest (bool): определять ли изменения записей по `digest` атрибуту
+        summary (str): режим итога пересчета: "ids" – идентификаторы
+            обработанных записей, "counts" – их количества, "sets" – их
+            множества (см. `summarize`)
+        segment_id (str): идентификатор сегмента
+
+    Возвращает:
+        pd.core.frame.DataFrame: датафрейм с итогом пересчета сегмента
+
+    """
+    node = parse(expression)
+    tables = operands(node)
+    if Table(str(table_name)) in tables:
+        raise ValueError('Сегмент {} ссылается на себя: {}'.format(table_name, expression))
+
+    types = catalog.columns(table_name, con).set_index('column_name').data_type
+    columns = [_ for _ in types.index if _ not in _service]
+    if 'id' not in columns:
+        raise ValueError('Отсутствует id атрибут сегментной таблицы {}'.format(table_name))
+
+    rows = []
+    for i, _ in enumerate(tables):
+        present = {*catalog.columns(_, con).column_name}
+        if 'id' not in present:
+            raise ValueError('Отсутствует таблица сегмента {}'.format(_))
+        rows.append("select {} as _operand, {} from {} where actual_end = 'infinity'".format(
+            i,
+            ', '.join(
+                x if x in present and x != 'segment_id' else
+                    'cast(null as {}) as {}'.format(types[x], x)
+                        for x in columns
+            ),
+            _
+        ))
+
+    con.execute(text(
+        """
+            drop table if exists _new;
+            create temp table _new as
+            select distinct on (_.id) {columns}
+            from (
+                {rows}
+            ) _
+            join ({ids}) _ids on _ids.id = _.id
+            order by _.id, _._operand;
+        """.format(
+            columns=', '.join(
+                'cast(:segment_id as {}) as segment_id'.format(types[x])
+                    if x == 'segment_id' and segment_id is not None else '_.' + x
+                        for x in columns
+            ),
+            rows='\n                union all '.join(rows),
+            ids=_ids(node)
+        )
+    ), {'segment_id': str(segment_id) if segment_id is not None else None})
+    merge(table_name, columns, con, digest)
+
+    return (summarize(table_name, con, summary), None)
@@ -0,0 +1,90 @@
+from ..utils import Table, catalog
+from .merge import _service, merge, summarize
+from contextlib import closing
+from importlib import import_module
+from io import StringIO
+from itertools import chain
+from sqlalchemy import column, engine, insert, table, text
+import pandas as pd
+import typing
+
+def refresh_dataframe(
+    table_name: Table,
+    data: typing.Union[pd.DataFrame, typing.Iterable[pd.DataFrame], str],
+    con: engine.Connection,
+    digest: bool = False,
+    summary: str = 'ids',
+    chunksize: int = 100000,
+    **kwargs
+) -> typing.Tuple[pd.DataFrame, typing.Union[bool, None]]:
+    """
+    Пересчет сегмента по датафрейму
+    ===============================
+
+    Декорируется `logger.decorate(...)` методом в рамках работы Сегментера.
+
+    Функция загружает сформированные в Python записи сегмента во временную
+    (не журналируемую) таблицу `_new` через `copy ... from stdin` – по одной
+    пачке за раз, поэтому потребление памяти ограничено размером пачки, а не
+    сегмента, – после чего сливает их с сегментом по SCD2 схеме (см. `merge`).
+    Типы атрибутов временной таблицы наследуются от сегментной. Итератор без
+    пачек означает пустой сегмент: все его актуальные записи закрываются.
+
+    Аргументы:
+        table_name (Table): сегментная таблица
+        data (pd.DataFrame, typing.Iterable[pd.DataFrame], str): датафрейм,
+            итератор его пачек или путь вида "пакет.модуль:функция" к функции
+            без аргументов, возвращающей одно из них, – для параметров
+            `refresh_params` конфигурационной таблицы
+        сon (sqlalchemy.engine.Connection): SQLalchemy подключение
+        digest (bool): определять ли изменения записей по `digest` атрибуту
+        summary (str): режим итога пересчета: "ids" – идентификаторы 
+            обработанных записей, "counts" – их количества, "sets" – их
+            множества (см. `summarize`)
+        chunksize (int): размер пачки при загрузке датафрейма
+
+    Возвращает:
+        pd.core.frame.DataFrame: датафрейм с итогом пересчета сегмента
+
+    """
+    if isinstance(data, str):
+        module, _, func = data.partition(':')
+        data = getattr(import_module(module), func)()
+    if isinstance(data, pd.DataFrame):
+        chunks = (data.iloc[i:i + chunksize] for i in range(0, max(len(data), 1), chunksize))
+    else:
+        chunks = iter(data)
+
+    first = next(chunks, None)
+    columns = first.columns.tolist() if first is not None else [
+        _ for _ in catalog.columns(table_name, con).column_name if _ not in _service
+    ]
+
+    con.execute(text("""
+        drop table if exists _new;
+        create temp table _new as
+        select {columns} from {table_name} where false;
+    """.format(columns=', '.join(columns), table_name=table_name)))
+
+    with closing(con.connection.cursor()) as dbapi:
+        for chunk in chain((first,), chunks) if first is not None else ():
+            if chunk.empty:
+                continue
+            chunk = chunk[columns]
+            if hasattr(dbapi, 'copy_expert'):
+                with StringIO() as buf:
+                    chunk.to_csv(buf, index=False, header=False)
+                    buf.seek(0)
+                    dbapi.copy_expert(
+                        'copy _new ({}) from stdin with (format csv);'.format(', '.join(columns)),
+                        buf
+                    )
+            else:
+                con.execute(insert(table('_new', *map(column, columns))).values(
+                    chunk.astype(object).where(chunk.notna(), None).to_dict('records')
+                ))
+
+    con.execute(text('analyze _new;'))
+    merge(table_name, columns, con, digest)
+
+    return (summarize(table_name, con, summary), None)
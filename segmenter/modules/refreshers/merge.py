@@ -0,0 +1,331 @@
+from ..utils import IdSet, Table, read_frame, stream_results
+from datetime import datetime
+from sqlalchemy import engine, text
+import numpy as np
+import pandas as pd
+import typing
+
+_service = ('actual_begin', 'actual_end', 'processed', 'digest')
+""" Служебные атрибуты SCD2 схемы, не заполняемые источником сегмента """
+
+def merge(
+    table_name: Table,
+    columns: typing.List[str],
+    con: engine.Connection,
+    digest: bool = False,
+    source: str = '_new'
+) -> None:
+    """
+    Слияние версий сегмента
+    =======================
+
+    Функция сливает записи `source` таблицы (по умолчанию – временной `_new`)
+    с актуальными (`actual_end = 'infinity'`) записями сегментной таблицы по
+    SCD2 схеме:
+    *   закрывает версии записей, отсутствующих в источнике или измененных,
+    *   вставляет новые и измененные записи.
+
+    Изменение записи определяется сравнением всех ее атрибутов или, в режиме
+    `digest`, сравнением хэша атрибутов источника с `digest` атрибутом
+    сегментной таблицы. В режиме `digest` неизменные записи не перезаписываются,
+    иначе – в них обновляется `processed` атрибут.
+
+    Аргументы:
+        table_name (Table): сегментная таблица
+        columns (list): перечень атрибутов источника
+        сon (sqlalchemy.engine.Connection): SQLalchemy подключение
+        digest (bool): сравнивать ли записи по `digest` атрибуту
+        source (str): таблица с новыми записями сегмента
+
+    """
+    columns = [x for x in columns if x not in ('id', 'digest')]
+    _columns = ['_.' + x for x in columns]
+    _new_columns = {('_new.' + x): ('new_' + x) for x in columns}
+    _digest = 'md5(row({})::text)'.format(', '.join(_new_columns.keys()))
+
+    con.execute(text(
+        """
+            /*
+                Построить сетку для соответствия между уже имеющимися в сегменте
+                данными и новыми записями.
+            */
+            drop table if exists _grid;
+            create temp table _grid as
+            select {new_columns_as}
+                , _.id is not null as existed
+                , _new.id is not null as present
+                , _.id is not null and {changed} as changed
+            from (select * from {table_name} where actual_end = 'infinity') _
+            full join {source} _new on _.id = _new.id;
+        """.format(
+            new_columns_as = ', '.join((
+                'coalesce(_.id, _new.id) as id',
+                *map(lambda x: x[0] + ' as ' + x[1], _new_columns.items()),
+                *((_digest + ' as new_digest',) if digest else ())
+            )),
+            changed = (
+                '_.digest is distinct from ' + _digest if digest else
+                'row({}) is distinct from row({})'.format(
+                    ', '.join(_columns), ', '.join(_new_columns.keys())
+                )
+            ) if columns else 'false',
+            table_name = table_name,
+            source = source
+        ) + \
+        ("""
+            /*
+                Обновить "processed" атрибут в сегменте для актуальных и
+                неизменных записей.
+            */
+            update {table_name} _
+            set processed = now()
+            from _grid
+            where true
+                and _.id = _grid.id
+                and _.actual_end = 'infinity'
+                and _grid.existed
+                and _grid.present
+                and not _grid.changed;
+        """.format(table_name = table_name) if not digest else '') + \
+        """
+            /*
+                Закрыть версии для измененных и отсутствующих в источнике,
+                актуальных в этом сегменте записей.
+            */
+            update {table_name} _
+            set actual_end = now()
+                , processed = now()
+            from _grid
+            where true
+                and _.id = _grid.id
+                and _.actual_end = 'infinity'
+                and _grid.existed
+                and (_grid.changed or not _grid.present);
+        """.format(table_name = table_name) + \
+        """
+            /*
+                Вставить в сегмент новые и измененные записи.
+            */
+            insert into {table_name} ({columns})
+            select {new_columns}
+            from _grid
+            where present and (changed or not existed);
+        """.format(
+            table_name = table_name,
+            columns = ', '.join(['id', *columns, *(('digest',) if digest else ())]),
+            new_columns = ', '.join([
+                'id', *_new_columns.values(), *(('new_digest',) if digest else ())
+            ])
+        )
+    ))
+
+def summarize(
+    table_name: Table,
+    con: engine.Connection,
+    summary: str = 'ids'
+) -> pd.DataFrame:
+    """
+    Итог пересчета сегмента
+    =======================
+
+    Функция возвращает итог пересчета сегмента в текущей транзакции – записи,
+    `processed` атрибут которых равен ее отметке времени `now()` (ее же 
+    получают записи, обработанные `merge`), – в одном из режимов:
+    *   ids – идентификаторы обработанных, добавленных и закрытых записей, по
+            строке на каждую обработанную запись,
+    *   counts – количества обработанных, добавленных и закрытых записей, 
+            рассчитанные на стороне хранилища, одной строкой,
+    *   sets – множества (`IdSet`) обработанных, добавленных и закрытых
+            идентификаторов одной строкой – компактная замена "ids" режима,
+            читаемая потоково.
+
+    Пересчет без изменений дает пустой итог: в режиме `digest` неизменные
+    записи не перезаписываются и не считаются обработанными. Функция 
+    вызывается в транзакции пересчета – после ее фиксации (в том числе 
+    процедурой, фиксирующей транзакцию самостоятельно) итог пуст.
+
+    Аргументы:
+        table_name (Table): сегментная таблица
+        сon (sqlalchemy.engine.Connection): SQLalchemy подключение
+        summary (str): режим итога: "ids", "counts" или "sets"
+
+    Возвращает:
+        pd.core.frame.DataFrame: датафрейм с итогом пересчета сегмента
+
+    """
+    if summary not in ('ids', 'counts', 'sets'):
+        raise ValueError('Неизвестный режим итога пересчета: {}'.format(summary))
+
+    sql = """
+        with _0 as (
+            select distinct id, actual_begin, actual_end, processed
+            from {0}
+            where processed = now()
+        )
+    """.format(table_name) + ("""
+        select distinct _0.id as processed, _1.id as added, _2.id as closed
+        from _0
+        left join _0 _1 on _0.id = _1.id and _1.actual_begin = _1.processed
+        left join _0 _2 on _0.id = _2.id and _2.actual_end = _2.processed
+        ;
+    """ if summary != 'counts' else """
+        select count(distinct id) as processed
+            , count(distinct id) filter (where actual_begin = processed) as added
+            , count(distinct id) filter (where actual_end = processed) as closed
+        from _0
+        ;
+    """)
+    if summary != 'sets':
+        return read_frame(sql, con)
+
+    hashes = {'processed': [], 'added': [], 'closed': []}
+    for chunk in stream_results(sql, con):
+        for k, v in hashes.items():
+            v.append(IdSet.hash(chunk[k]))
+    return pd.DataFrame([{k: IdSet(np.concatenate(v)) for k, v in hashes.items()}])
+
+def deltas(
+    table_name: Table,
+    con: engine.Connection,
+    since: typing.Union[datetime, None] = None,
+    until: typing.Union[datetime, None] = None,
+    chunksize: int = 100000
+) -> typing.Generator[pd.DataFrame, None, None]:
+    """
+    Изменения сегмента
+    ==================
+
+    Функция-генератор возвращает пачками по `chunksize` записей только 
+    добавленные и закрытые записи сегмента: атрибуты `id` и `change` – 
+    "added" или "closed". Записи читаются курсором на стороне хранилища (см.
+    `stream_results`), без буферизации всего результата на стороне клиента.
+
+    Без `since` возвращаются изменения пересчета в текущей транзакции – как
+    и в итоге `summarize`, – иначе изменения пересчетов после `since` и не
+    позднее `until` (см. `watermark`).
+
+    Аргументы:
+        table_name (Table): сегментная таблица
+        сon (sqlalchemy.engine.Connection): SQLalchemy подключение
+        since (datetime): изменения после указанного момента, None – изменения
+            пересчета в текущей транзакции
+        until (datetime): изменения не позднее указанного момента, None – без
+            ограничения
+        chunksize (int): размер пачки
+
+    Возвращает:
+        typing.Generator[pd.DataFrame, None, None]: пачки изменений
+
+    """
+    processed = 'processed = now()' if since is None else \
+        "processed > :since and processed <= coalesce(cast(:until as timestamp), 'infinity')"
+    yield from stream_results("""
+        select id, 'added' as change
+        from {0}
+        where actual_begin = processed and {1}
+        union all
+        select id, 'closed' as change
+        from {0}
+        where actual_end = processed and {1}
+        ;
+    """.format(table_name, processed), con, {'since': since, 'until': until}, chunksize)
+
+def watermark(
+    table_name: Table,
+    con: engine.Connection
+) -> typing.Union[datetime, None]:
+    """
+    Отметка последнего пересчета сегмента
+    =====================================
+
+    Возвращает:
+        datetime: максимальный `processed` атрибут сегмента или None – для
+            пустого сегмента
+
+    """
+    return con.execute(text(
+        'select max(processed) from {};'.format(table_name)
+    )).scalar()
+
+def audience_deltas(
+    table_name: Table,
+    con: engine.Connection,
+    since: typing.Union[datetime, None],
+    until: datetime,
+    full: bool = False,
+    chunksize: int = 100000
+) -> typing.Generator[pd.DataFrame, None, None]:
+    """
+    Изменения аудитории сегмента
+    ============================
+
+    Функция-генератор по SCD2 истории сегмента сравнивает его состав на два
+    момента – `since` (предыдущая синхронизация) и `until` – и возвращает
+    пачками по `chunksize` записей идентификаторы, вошедшие в сегмент
+    (`change` = "added") и выбывшие из него ("removed"). Изменение атрибутов
+    записи без изменения ее наличия в сегменте изменением не считается.
+    Рассматриваются только идентификаторы, версии которых открывались или
+    закрывались между `since` и `until`.
+
+    В режиме `full` (или без `since`) возвращаются все идентификаторы сегмента
+    на момент `until` как вошедшие и все когда-либо входившие в него, но
+    отсутствующие на момент `until` – как выбывшие: полная синхронизация.
+
+    Аргументы:
+        table_name (Table): сегментная таблица
+        сon (sqlalchemy.engine.Connection): SQLalchemy подключение
+        since (datetime): момент предыдущей синхронизации
+        until (datetime): момент текущей синхронизации (см. `watermark`)
+        full (bool): полная синхронизация
+        chunksize (int): размер пачки
+
+    Возвращает:
+        typing.Generator[pd.DataFrame, None, None]: пачки изменений
+
+    """
+    full = full or since is None
+    yield from stream_results("""
+        with _changed as (
+            select distinct id
+            from {table_name}
+            where true
+                and id is not null
+                {changed}
+        ), _states as (
+            select _.id
+                , bool_or(_.actual_begin <= :since and _.actual_end > :since) as was
+                , bool_or(_.actual_begin <= :until and _.actual_end > :until) as present
+            from {table_name} _
+            join _changed using (id)
+            where _.actual_begin <= :until
+            group by _.id
+        )
+        select id
+            , case when present then 'added' else 'removed' end as change
+        from _states
+        where {filter};
+    """.format(
+        table_name=table_name,
+        filter='true' if full else 'present <> was',
+        changed='' if full else """
+                and (
+                    actual_begin > :since and actual_begin <= :until
+                    or actual_end > :since and actual_end <= :until
+                )"""
+    ), con, {
+        'since': datetime.min if full else since, 'until': until
+    }, chunksize)
+
+def audience_size(
+    table_name: Table,
+    con: engine.Connection,
+    until: datetime
+) -> int:
+    """
+    Размер аудитории сегмента на момент `until`
+    """
+    return con.execute(text("""
+        select count(distinct id)
+        from {}
+        where id is not null and actual_begin <= :until and actual_end > :until;
+    """.format(table_name)), {'until': until}).scalar()
@@ -1,4 +1,5 @@
 from ..utils import Table
+from .merge import summarize
 from sqlalchemy import engine, text
 import pandas as pd
 import typing
@@ -7,6 +8,7 @@ def refresh_procedure(
     table_name: Table,
     sql: str,
     con: engine.Connection,
+    summary: str = 'ids',
     **kwargs
 ) -> typing.Tuple[pd.DataFrame, typing.Union[bool, None]]:
     """
@@ -21,24 +23,14 @@ def refresh_procedure(
         sql (str): вызов процедуры вида "call public.update_test_segment();"
         сon (sqlalchemy.engine.Connection): SQLalchemy подключение
         table_name (Table): сегментная таблица
+        summary (str): режим итога пересчета: "ids" – идентификаторы 
+            обработанных записей, "counts" – их количества, "sets" – их
+            множества (см. `summarize`)
 
     Возвращает:
-        pd.core.frame.DataFrame: датафрейм с обработанными записями сегмента
+        pd.core.frame.DataFrame: датафрейм с итогом пересчета сегмента
     
     """
     con.execute(text(sql))
 
-    return (pd.read_sql("""
-        with _0 as (
-            select distinct id, actual_begin, actual_end, processed
-            from {}
-            where true
-                and processed = (select max(processed) from public.test_segment)
-                and processed::date = now()::date
-        )
-        select distinct _0.id as processed, _1.id as added, _2.id as closed
-        from _0
-        left join _0 _1 on _0.id = _1.id and _1.actual_begin = _1.processed
-        left join _0 _2 on _0.id = _2.id and _2.actual_end = _2.processed
-        ;
-    """.format(table_name), con), None)
\ No newline at end of file
+    return (summarize(table_name, con, summary), None)
\ No newline at end of file
@@ -2,4 +2,15 @@
 Загрузчики
 ==========
 
-"""
\ No newline at end of file
+Таргеты – реализации `utils.Target`, выгружающие аудитории во внешние системы.
+Таргет подписки определяется `engine` параметром потребителя (по умолчанию –
+наименованием таргета подписки) по `targets` словарю.
+
+"""
+from .http import AsyncHttpTarget, HttpTarget
+
+targets = {
+    'http': HttpTarget,
+    'http_async': AsyncHttpTarget,
+}
+""" Доступные таргеты по наименованию """
@@ -0,0 +1,476 @@
+from ..utils.hashing import Hasher
+from ..utils.logger import Logger
+from ..utils.target import AsyncTarget, Target
+from ..utils.throttle import HostLimits, TokenBucket
+from concurrent.futures import ThreadPoolExecutor
+from random import random
+from time import sleep
+from urllib.parse import urlsplit
+import asyncio
+import pandas as pd
+import typing
+
+class HttpTarget(Target):
+    """
+    HTTP таргет
+    ===========
+
+    Таргет, выгружающий аудитории через REST API вида:
+        GET    {base_url}/audiences                  – перечень аудиторий
+        POST   {base_url}/audiences                  – создание аудитории
+        POST   {base_url}/audiences/{audience}/members   – добавление
+        DELETE {base_url}/audiences/{audience}/members   – удаление
+    Пути задаются `paths` атрибутом и переопределяются наследниками под API
+    конкретных сервисов; тело запроса изменения аудитории – `{"ids": [...]}`.
+
+    Идентификаторы выгружаются пачками по `chunksize` параллельно в `workers`
+    потоков через общую сессию с пулом из `workers` подключений. Частота
+    запросов ограничивается `rate` запросов в секунду (см. `TokenBucket`);
+    запросы, завершившиеся сетевой ошибкой, 429 или 5xx ответом, повторяются
+    до `retries` раз с экспоненциальной задержкой от `backoff` секунд (или по
+    `Retry-After` заголовку).
+
+    При переданном `hashing` идентификаторы перед отправкой нормализуются и
+    хэшируются под требования сервиса (см. `Hasher`); к кэшу хэшей в 
+    хранилище таргет подключается только на время обращения к нему.
+
+    Параметры передаются `dict` представлением подключения из Airflow:
+    `host`, `port`, `schema` формируют `base_url`, если он не передан явно,
+    `password` – токен авторизации.
+
+    """
+
+    paths = {
+        'select': ('GET', 'audiences'),
+        'create': ('POST', 'audiences'),
+        'update': ('POST', 'audiences/{audience}/members'),
+        'remove': ('DELETE', 'audiences/{audience}/members'),
+    }
+    """ Методы и пути запросов API """
+
+    retry_statuses = (429, 500, 502, 503, 504)
+    """ Статусы ответов, после которых запрос повторяется """
+
+    def __init__(
+        self,
+        logger: Logger,
+        base_url: typing.Union[str, None] = None,
+        host: typing.Union[str, None] = None,
+        port: typing.Union[int, None] = None,
+        schema: typing.Union[str, None] = None,
+        password: typing.Union[str, None] = None,
+        headers: typing.Union[dict, None] = None,
+        chunksize: int = 10000,
+        workers: int = 4,
+        rate: typing.Union[float, None] = 10,
+        burst: typing.Union[float, None] = None,
+        retries: int = 5,
+        backoff: float = 0.5,
+        timeout: float = 30,
+        paths: typing.Union[dict, None] = None,
+        hashing: typing.Union[dict, None] = None,
+        **kwargs
+    ) -> None:
+        """
+        Аргументы:
+            logger (Logger): логгер сегментера
+            base_url (str): базовый адрес API
+            host, port, schema (str): составляющие базового адреса – если
+                `base_url` не передан
+            password (str): токен авторизации (`Authorization: Bearer ...`)
+            headers (dict): дополнительные заголовки запросов
+            chunksize (int): количество идентификаторов в одном запросе
+            workers (int): количество одновременных запросов
+            rate (float): допустимое количество запросов в секунду, None – без
+                ограничения
+            burst (float): допустимый всплеск запросов, по умолчанию – `rate`
+            retries (int): количество повторов запроса
+            backoff (float): начальная задержка перед повтором в секундах
+            timeout (float): таймаут запроса в секундах
+            paths (dict): переопределение `paths` атрибута
+            hashing (dict): параметры `Hasher` – например, {"kind": "phone",
+                "algorithm": "sha256", "workers": 4}, None – без хэширования
+
+        """
+        super().__init__(logger, **kwargs)
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = self._base_url(base_url, host, port, schema)
+        self.chunksize = chunksize
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.paths = {**self.paths, **(paths or {})}
+        self.bucket = TokenBucket(rate, burst)
+        self.hasher = Hasher(**hashing) if hashing else None
+
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+        self.session.headers.update({
+            **({'Authorization': 'Bearer ' + password} if password else {}),
+            **(headers or {})
+        })
+
+    @staticmethod
+    def _base_url(
+        base_url: typing.Union[str, None],
+        host: typing.Union[str, None],
+        port: typing.Union[int, None],
+        schema: typing.Union[str, None]
+    ) -> str:
+        """
+        Базовый адрес API из параметров подключения
+        """
+        if not base_url:
+            base_url = '{}{}{}'.format(
+                host if '://' in (host or '') else 'https://' + (host or 'localhost'),
+                ':{}'.format(port) if port else '',
+                '/' + schema.strip('/') if schema else ''
+            )
+        return base_url.rstrip('/')
+
+    def request(self, action: str, json: typing.Any = None, **kwargs) -> typing.Any:
+        """
+        Запрос к API
+        ============
+
+        Выполняет запрос `action` из `self.paths` (путь форматируется
+        `kwargs`) с ограничением частоты и повторами.
+
+        Возвращает:
+            typing.Any: JSON тело ответа или None – для пустого ответа
+
+        """
+        import requests
+
+        method, path = self.paths[action]
+        url = '{}/{}'.format(self.base_url, path.format(**kwargs))
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.request(method, url, json=json, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                sleep(self.backoff * 2 ** attempt * (1 + random()))
+                continue
+            if response.status_code in self.retry_statuses and attempt < self.retries:
+                delay = response.headers.get('Retry-After')
+                delay = float(delay) if delay and delay.isdigit() else \
+                    self.backoff * 2 ** attempt * (1 + random())
+                if response.status_code == 429:
+                    self.bucket.penalize(delay)
+                else:
+                    sleep(delay)
+                continue
+            response.raise_for_status()
+            return response.json() if response.content else None
+
+    def chunks(self, ids: typing.Iterable) -> typing.Iterator[list]:
+        """
+        Разбиение идентификаторов на пачки по `self.chunksize`
+        """
+        ids = pd.Series(ids, dtype=object).dropna().astype(str).tolist()
+        for i in range(0, len(ids), self.chunksize):
+            yield ids[i:i + self.chunksize]
+
+    def send(self, action: str, audience: str, ids: typing.Iterable) -> pd.DataFrame:
+        """
+        Параллельная отправка идентификаторов пачками
+        =============================================
+
+        Идентификаторы предварительно хэшируются `self.hasher` (при наличии).
+
+        Возвращает:
+            pd.core.frame.DataFrame: датафрейм с количеством идентификаторов
+                каждой пачки (`sent`) и ошибкой ее отправки (`error`)
+
+        """
+        def _send(chunk: list) -> dict:
+            try:
+                self.request(action, json={'ids': chunk}, audience=audience)
+                return {'sent': len(chunk), 'error': None}
+            except Exception as e:
+                return {'sent': 0, 'error': repr(e)}
+
+        if self.hasher:
+            ids = self.hasher(ids, connect=self.logger.connect)
+        with ThreadPoolExecutor(self.workers) as pool:
+            result = pd.DataFrame(
+                [*pool.map(_send, self.chunks(ids))], columns=['sent', 'error']
+            )
+        if result.error.notna().any():
+            raise RuntimeError('Не отправлено {} из {} пачек: {}'.format(
+                result.error.notna().sum(), len(result), result.error.dropna().iloc[0]
+            ))
+        return result
+
+    def parse(self, data: typing.Any, **kwargs) -> pd.DataFrame:
+        """
+        Разбор перечня аудиторий
+        ========================
+
+        """
+        if isinstance(data, dict):
+            data = data.get('items', data.get('audiences', []))
+        data = pd.DataFrame(data or [])
+        return data.reindex(columns=[
+            'id', 'name', *data.columns.drop(['id', 'name'], errors='ignore')
+        ])
+
+    def select(self, con: typing.Any = None, **kwargs) -> typing.Tuple[pd.DataFrame, None]:
+        """
+        Получение перечня аудиторий
+        ===========================
+
+        """
+        return (self.parse(self.request('select')), None)
+
+    def create(self, name: str, con: typing.Any = None, **kwargs) -> typing.Tuple[typing.Any, str]:
+        """
+        Создание аудитории
+        ==================
+
+        """
+        data = self.request('create', json={'name': name})
+        return (data, str(data['id']))
+
+    def update(
+        self,
+        audience: str,
+        ids: pd.Series,
+        con: typing.Any = None,
+        **kwargs
+    ) -> typing.Tuple[pd.DataFrame, None]:
+        """
+        Добавление идентификаторов в аудиторию
+        ======================================
+
+        """
+        return (self.send('update', audience, ids), None)
+
+    def remove(
+        self,
+        audience: str,
+        ids: pd.Series,
+        con: typing.Any = None,
+        **kwargs
+    ) -> typing.Tuple[pd.DataFrame, None]:
+        """
+        Удаление идентификаторов из аудитории
+        =====================================
+
+        """
+        return (self.send('remove', audience, ids), None)
+
+    def close(self) -> None:
+        self.session.close()
+        if self.hasher:
+            self.hasher.close()
+
+class AsyncHttpTarget(AsyncTarget):
+    """
+    Асинхронный HTTP таргет
+    =======================
+
+    Таргет с API и параметрами `HttpTarget`, выполняющий запросы через 
+    `aiohttp` в цикле событий: пачки идентификаторов всех выгружаемых 
+    подписок отправляются конкурентно из одного потока. Количество 
+    одновременных запросов ограничивается на хост общим для всех таргетов
+    `limits` ограничителем (см. `HostLimits`, по умолчанию – собственным с
+    лимитом `workers`), частота – `rate` запросов в секунду.
+
+    Сессия `aiohttp` привязывается к циклу событий, создается при первом 
+    запросе в нем и закрывается `aclose()`. Хэширование (`hashing`) 
+    выполняется в отдельном потоке – с подключением к кэшу хэшей в
+    хранилище только на время обращения к нему.
+
+    """
+
+    paths = HttpTarget.paths
+    retry_statuses = HttpTarget.retry_statuses
+
+    chunks = HttpTarget.chunks
+    parse = HttpTarget.parse
+
+    def __init__(
+        self,
+        logger: Logger,
+        base_url: typing.Union[str, None] = None,
+        host: typing.Union[str, None] = None,
+        port: typing.Union[int, None] = None,
+        schema: typing.Union[str, None] = None,
+        password: typing.Union[str, None] = None,
+        headers: typing.Union[dict, None] = None,
+        chunksize: int = 10000,
+        workers: int = 8,
+        rate: typing.Union[float, None] = 10,
+        burst: typing.Union[float, None] = None,
+        retries: int = 5,
+        backoff: float = 0.5,
+        timeout: float = 30,
+        paths: typing.Union[dict, None] = None,
+        hashing: typing.Union[dict, None] = None,
+        limits: typing.Union[HostLimits, None] = None,
+        **kwargs
+    ) -> None:
+        """
+        Аргументы:
+            см. `HttpTarget`
+            workers (int): лимит одновременных запросов к хосту – при 
+                отсутствии `limits`
+            limits (HostLimits): общий ограничитель одновременных запросов к
+                хостам (см. `Segmenter.target`)
+
+        """
+        super().__init__(logger, **kwargs)
+        self.base_url = HttpTarget._base_url(base_url, host, port, schema)
+        self.host = urlsplit(self.base_url).netloc
+        self.chunksize = chunksize
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.paths = {**self.paths, **(paths or {})}
+        self.bucket = TokenBucket(rate, burst)
+        self.limits = limits or HostLimits(workers)
+        self.hasher = Hasher(**hashing) if hashing else None
+        self.headers = {
+            **({'Authorization': 'Bearer ' + password} if password else {}),
+            **(headers or {})
+        }
+        self._session = None
+        self._loop = None
+
+    def session(self) -> typing.Any:
+        """
+        Сессия `aiohttp` текущего цикла событий
+        """
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=0)
+            )
+            self._loop = loop
+        return self._session
+
+    async def request(self, action: str, json: typing.Any = None, **kwargs) -> typing.Any:
+        """
+        Запрос к API
+        ============
+
+        См. `HttpTarget.request`.
+
+        """
+        import aiohttp
+
+        method, path = self.paths[action]
+        url = '{}/{}'.format(self.base_url, path.format(**kwargs))
+        for attempt in range(self.retries + 1):
+            await asyncio.sleep(self.bucket.reserve())
+            try:
+                async with self.limits(self.host), \
+                    self.session().request(method, url, json=json) as response:
+                    if response.status not in self.retry_statuses or attempt == self.retries:
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+                    delay = response.headers.get('Retry-After')
+                    status = response.status
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** attempt * (1 + random()))
+                continue
+            delay = float(delay) if delay and delay.isdigit() else \
+                self.backoff * 2 ** attempt * (1 + random())
+            if status == 429 and self.bucket.rate:
+                self.bucket.penalize(delay)
+            else:
+                await asyncio.sleep(delay)
+
+    async def send(self, action: str, audience: str, ids: typing.Iterable) -> pd.DataFrame:
+        """
+        Конкурентная отправка идентификаторов пачками
+        =============================================
+
+        См. `HttpTarget.send`.
+
+        """
+        async def _send(chunk: list) -> dict:
+            try:
+                await self.request(action, json={'ids': chunk}, audience=audience)
+                return {'sent': len(chunk), 'error': None}
+            except Exception as e:
+                return {'sent': 0, 'error': repr(e)}
+
+        if self.hasher:
+            ids = await asyncio.to_thread(self.hasher, ids, connect=self.logger.connect)
+        result = pd.DataFrame(
+            await asyncio.gather(*map(_send, self.chunks(ids))), columns=['sent', 'error']
+        )
+        if result.error.notna().any():
+            raise RuntimeError('Не отправлено {} из {} пачек: {}'.format(
+                result.error.notna().sum(), len(result), result.error.dropna().iloc[0]
+            ))
+        return result
+
+    async def select(self, con: typing.Any = None, **kwargs) -> typing.Tuple[pd.DataFrame, None]:
+        """
+        Получение перечня аудиторий
+        ===========================
+
+        """
+        return (self.parse(await self.request('select')), None)
+
+    async def create(self, name: str, con: typing.Any = None, **kwargs) -> typing.Tuple[typing.Any, str]:
+        """
+        Создание аудитории
+        ==================
+
+        """
+        data = await self.request('create', json={'name': name})
+        return (data, str(data['id']))
+
+    async def update(
+        self,
+        audience: str,
+        ids: pd.Series,
+        con: typing.Any = None,
+        **kwargs
+    ) -> typing.Tuple[pd.DataFrame, None]:
+        """
+        Добавление идентификаторов в аудиторию
+        ======================================
+
+        """
+        return (await self.send('update', audience, ids), None)
+
+    async def remove(
+        self,
+        audience: str,
+        ids: pd.Series,
+        con: typing.Any = None,
+        **kwargs
+    ) -> typing.Tuple[pd.DataFrame, None]:
+        """
+        Удаление идентификаторов из аудитории
+        =====================================
+
+        """
+        return (await self.send('remove', audience, ids), None)
+
+    async def aclose(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session, self._loop = None, None
+
+    def close(self) -> None:
+        self._session, self._loop = None, None
+        if self.hasher:
+            self.hasher.close()
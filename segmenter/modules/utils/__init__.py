@@ -2,8 +2,54 @@
 Утилиты
 =======
 
+Утилиты импортируются при первом обращении к ним (см. `_exports`), поэтому
+импорт пакета не загружает зависимости неиспользуемых утилит.
+
 """
+from importlib import import_module
+import typing
+
+if typing.TYPE_CHECKING:
+    from .table import Table
+    from .metadata import Catalog, catalog
+    from .sink import LogSink
+    from .logger import Logger
+    from .target import AsyncTarget, Target
+    from .throttle import HostLimits, TokenBucket
+    from .hashing import Hasher, fingerprint, hash_values, normalizers
+    from .idset import IdSet
+    from .executor import execute
+    from .manager import Manager, fan_out
+    from .pool import PoolMetrics
+    from .metrics import Metrics, QueryStats, measure, track_queries
+    from .sql import describe, forget, read_frame, stream_results
+    from .cron import cron_compile, cron_evaluate, cron_next
+
+_exports = {
+    'Table': '.table',
+    'Catalog': '.metadata', 'catalog': '.metadata',
+    'LogSink': '.sink',
+    'Logger': '.logger',
+    'AsyncTarget': '.target', 'Target': '.target',
+    'HostLimits': '.throttle', 'TokenBucket': '.throttle',
+    'Hasher': '.hashing', 'fingerprint': '.hashing', 'hash_values': '.hashing',
+    'normalizers': '.hashing',
+    'IdSet': '.idset',
+    'execute': '.executor',
+    'Manager': '.manager', 'fan_out': '.manager',
+    'PoolMetrics': '.pool',
+    'Metrics': '.metrics', 'QueryStats': '.metrics', 'measure': '.metrics',
+    'track_queries': '.metrics',
+    'describe': '.sql', 'forget': '.sql', 'read_frame': '.sql', 'stream_results': '.sql',
+    'cron_compile': '.cron', 'cron_evaluate': '.cron', 'cron_next': '.cron',
+}
+""" Соответствие экспортируемых имен модулям утилит """
+
+__all__ = [*_exports]
 
-from .table import Table
-from .logger import Logger
-from .target import Target
\ No newline at end of file
+def __getattr__(name: str) -> typing.Any:
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+import pandas as pd
+import typing
+
+if typing.TYPE_CHECKING:
+    from cron_converter import Cron
+
+@lru_cache(maxsize=None)
+def cron_compile(refresh_cron: str) -> 'Cron':
+    """
+    Разбор CRON-расписания
+    ======================
+
+    Функция разбирает CRON-выражение и кэширует результат – каждое уникальное
+    выражение разбирается один раз за время работы процесса. Библиотека
+    cron_converter импортируется при первом разборе.
+
+    """
+    from cron_converter import Cron
+    return Cron(refresh_cron)
+
+def _occurrences(
+    refresh_cron: str,
+    date: datetime
+) -> typing.Tuple[typing.Union[datetime, None], typing.Union[datetime, None]]:
+    """
+    Последнее срабатывание расписания не позднее `date` и первое – после него
+    """
+    try:
+        cron = cron_compile(refresh_cron)
+    except Exception:
+        return (None, None)
+    start = date.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    return (
+        cron.schedule(start).prev().replace(tzinfo=None),
+        cron.schedule(start).next().replace(tzinfo=None)
+    )
+
+def cron_evaluate(
+    refresh_cron: pd.Series,
+    date: typing.Union[datetime, None] = None,
+    since: typing.Union[datetime, pd.Series, None] = None
+) -> pd.DataFrame:
+    """
+    Проверка готовности по CRON-расписаниям
+    =======================================
+
+    Функция за один вызов рассчитывает готовность для всех переданных
+    расписаний: каждое уникальное выражение рассчитывается один раз, а его
+    результат распространяется на все записи с этим выражением.
+
+    Расписание готово, если его последнее срабатывание не позднее `date`
+    произошло после `since` – момента предыдущей проверки; без `since` готовы
+    все корректные расписания. Некорректные расписания не готовы никогда.
+
+    Аргументы:
+        refresh_cron (pd.Series): CRON-выражения
+        date (datetime): момент проверки, по умолчанию – текущий
+        since (datetime): момент предыдущей проверки – общий или серия с
+            индексом `refresh_cron`
+
+    Возвращает:
+        pd.core.frame.DataFrame: датафрейм с индексом переданной серии и
+            атрибутами `refresh_date` – последнее срабатывание, `next_date` –
+            следующее срабатывание, `current_date`, `refresh` – готовность
+
+    """
+    date = (date or datetime.now()).replace(microsecond=0, tzinfo=None)
+    occurrences = {_: _occurrences(_, date) for _ in refresh_cron.dropna().unique()}
+
+    data = pd.DataFrame({
+        'refresh_cron': refresh_cron,
+        'refresh_date': pd.to_datetime(refresh_cron.map(lambda x: occurrences.get(x, (None, None))[0])),
+        'next_date': pd.to_datetime(refresh_cron.map(lambda x: occurrences.get(x, (None, None))[1])),
+        'current_date': date,
+    }, index=refresh_cron.index)
+    data['refresh'] = data.refresh_date.notna() & (
+        data.refresh_date > since if since is not None else True
+    )
+
+    return data
+
+def cron_next(
+    refresh_cron: pd.Series,
+    date: typing.Union[datetime, None] = None
+) -> typing.Union[datetime, None]:
+    """
+    Ближайшее срабатывание CRON-расписаний
+    ======================================
+
+    Возвращает:
+        datetime: ближайшее после `date` срабатывание среди всех расписаний
+            или None – при отсутствии корректных расписаний
+
+    """
+    next_date = cron_evaluate(refresh_cron, date).next_date.min()
+
+    return None if pd.isna(next_date) else next_date.to_pydatetime()
@@ -0,0 +1,81 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from .logger import Logger
+from traceback import format_exc
+import typing
+
+def execute(
+    func: typing.Callable,
+    items: typing.Dict[typing.Hashable, typing.Any],
+    depends: typing.Union[typing.Dict[typing.Hashable, typing.Iterable], None] = None,
+    workers: int = 1,
+    logger: typing.Union[Logger, None] = None
+) -> typing.Dict[typing.Hashable, typing.Any]:
+    """
+    Исполнение задач с учетом зависимостей
+    ======================================
+
+    Функция вызывает `func(item)` для каждого элемента `items` в пуле из
+    `workers` потоков. Элемент запускается только после завершения всех
+    элементов, от которых он зависит (`depends`), – зависимости, отсутствующие
+    в `items`, игнорируются. Если зависимость завершилась неуспешно (вернула
+    None или выбросила исключение), зависимый элемент не запускается и его
+    результатом считается None.
+
+    Элементы, входящие в цикл зависимостей или зависящие от такого элемента,
+    не запускаются – их результатом считается None; исключение `func`
+    логируется и также дает None. Остальные элементы исполняются как обычно.
+
+    Аргументы:
+        func (typing.Callable): функция обработки одного элемента
+        items (dict): обрабатываемые элементы вида {ключ: элемент}
+        depends (dict): зависимости вида {ключ: [ключи зависимостей]}
+        workers (int): максимальное количество одновременно исполняемых задач
+        logger (Logger): логгер циклических зависимостей и ошибок элементов
+
+    Возвращает:
+        dict: результаты обработки вида {ключ: результат} в порядке `items`
+
+    """
+    depends = {
+        k: {_ for _ in (depends or {}).get(k) or () if _ in items and _ != k}
+            for k in items
+    }
+
+    ### Проверка на циклические зависимости
+    resolved, pending = set(), dict(depends)
+    while pending:
+        ready = {k for k, v in pending.items() if v <= resolved}
+        if not ready:
+            break
+        resolved |= ready
+        pending = {k: v for k, v in pending.items() if k not in ready}
+
+    results: typing.Dict[typing.Hashable, typing.Any] = dict.fromkeys(pending)
+    if pending and logger:
+        logger.error('Обнаружены циклические зависимости: {}', sorted(map(str, pending)))
+    if pending:
+        depends = {k: v for k, v in depends.items() if k not in pending}
+    running: typing.Dict[Future, typing.Hashable] = {}
+    pending = dict(depends)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while pending or running:
+            for k in [k for k, v in pending.items() if v <= results.keys()]:
+                del pending[k]
+                if any(results[_] is None for _ in depends[k]):
+                    results[k] = None
+                else:
+                    running[pool.submit(func, items[k])] = k
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                k = running.pop(future)
+                try:
+                    results[k] = future.result()
+                except Exception:
+                    if logger:
+                        logger.error('Ошибка обработки элемента {}:\n{}', k, format_exc())
+                    results[k] = None
+
+    return {k: results[k] for k in items}
@@ -0,0 +1,278 @@
+from .table import Table
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from itertools import repeat
+from sqlalchemy import engine, text
+import hashlib
+import numpy as np
+import pandas as pd
+import typing
+
+def _strings(values: pd.Series) -> pd.Series:
+    """
+    Строковое представление значений: целые числа – без дробной части,
+    пропуски сохраняются
+    """
+    if pd.api.types.is_float_dtype(values):
+        values = values.where(values % 1 == 0).astype('Int64')
+    elif values.dtype == object:
+        floats = values.map(type) == float
+        if floats.any():
+            values = values.where(~floats, _strings(values[floats].astype(float)))
+    return values.astype(str).where(values.notna())
+
+def normalize_email(values: pd.Series, **kwargs) -> pd.Series:
+    """
+    Нормализация адресов электронной почты: без пробелов, в нижнем регистре
+    """
+    values = _strings(values).str.strip().str.lower()
+    return values.where(values.str.len() > 0)
+
+def normalize_phone(values: pd.Series, country: str = '7', plus: bool = True, **kwargs) -> pd.Series:
+    """
+    Нормализация телефонов к E.164 формату
+    ======================================
+
+    Оставляет только цифры, заменяет национальный префикс "8" 11-значных
+    номеров кодом страны `country` и дополняет им 10-значные номера.
+
+    Аргументы:
+        values (pd.Series): телефоны
+        country (str): код страны
+        plus (bool): добавлять ли "+" перед номером
+
+    """
+    digits = _strings(values).str.replace(r'\D', '', regex=True)
+    digits = digits.where(
+        ~((digits.str.len() == 11) & digits.str.startswith('8')),
+        country + digits.str[1:]
+    )
+    digits = digits.where(digits.str.len() != 10, country + digits)
+    return (('+' if plus else '') + digits).where(digits.str.len() > 0)
+
+normalizers = {
+    'email': normalize_email,
+    'phone': normalize_phone,
+    'id': lambda values, **kwargs: values.astype(str),
+}
+""" Нормализаторы по типу значений """
+
+def _hash_chunk(values: typing.List[typing.Union[str, None]], algorithm: str) -> typing.List[typing.Union[str, None]]:
+    """
+    Хэширование пачки значений – выполняется в процессах пула
+    """
+    func = getattr(hashlib, algorithm)
+    return [None if _ is None else func(_.encode()).hexdigest() for _ in values]
+
+def hash_values(
+    values: pd.Series,
+    algorithm: str = 'sha256',
+    pool: typing.Union[Executor, None] = None,
+    chunksize: int = 100000
+) -> pd.Series:
+    """
+    Хэширование значений
+    ====================
+
+    Хэширует нормализованные значения пачками по `chunksize`; при переданном
+    пуле процессов `pool` и нескольких пачках – параллельно в нем.
+
+    Возвращает:
+        pd.Series: шестнадцатеричные хэши с индексом `values`, пропуски – для
+            пропущенных значений
+
+    """
+    getattr(hashlib, algorithm)
+    data = values.astype(object).where(values.notna(), None).tolist()
+    chunks = [data[i:i + chunksize] for i in range(0, len(data), chunksize)]
+    if pool is not None and len(chunks) > 1:
+        hashed = [*pool.map(_hash_chunk, chunks, repeat(algorithm))]
+    else:
+        hashed = [_hash_chunk(_, algorithm) for _ in chunks]
+    return pd.Series(
+        [_ for chunk in hashed for _ in chunk], index=values.index, dtype=object
+    )
+
+def fingerprint(values: pd.Series) -> np.ndarray:
+    """
+    64-битные отпечатки значений (`pd.util.hash_array`) для поиска в кэше
+    """
+    return pd.util.hash_array(values.astype(object).to_numpy()).view('int64')
+
+class Hasher:
+    """
+    Хэширование контактов
+    =====================
+
+    Объект нормализует значения (`kind` – см. `normalizers`) целыми
+    массивами и хэширует их `algorithm` алгоритмом `hashlib` – каждое
+    уникальное нормализованное значение один раз. Хэши кэшируются в памяти
+    процесса (до `cache_size` значений – между пересчетами резидентного
+    режима) и, при переданной `table` таблице, в хранилище по отпечаткам
+    значений (см. `fingerprint`), поэтому неизменные контакты не хэшируются
+    повторно при следующих выгрузках. Кэш в хранилище оправдан для
+    дорогих в вычислении хэшей: обращение к нему дороже вычисления md5/sha256
+    в одном процессе.
+
+        hasher = Hasher('phone', 'sha256', workers=4)
+        hashes = hasher(phones, con)
+        hashes = hasher(phones, connect=segmenter.connect)
+
+    Пул из `workers` процессов создается при первом хэшировании нескольких
+    пачек и используется всеми последующими вызовами до `close()`.
+
+    Методы:
+        __call__: нормализация и хэширование значений с использованием кэша
+        close: завершение пула процессов хэширования
+
+    Свойства:
+        kind: тип значений
+        algorithm: алгоритм хэширования
+        key: ключ кэша – тип и параметры нормализации
+
+    """
+
+    def __init__(
+        self,
+        kind: str = 'email',
+        algorithm: str = 'sha256',
+        table: typing.Union[str, Table, None] = None,
+        workers: int = 1,
+        chunksize: int = 100000,
+        cache_size: int = 1000000,
+        **kwargs
+    ) -> None:
+        """
+        Аргументы:
+            kind (str): тип значений – ключ `normalizers`
+            algorithm (str): алгоритм хэширования `hashlib`
+            table (Table): таблица кэша хэшей в хранилище (см. 
+                `__tables__/segmenter_hashes.sql`), None – только кэш в памяти
+            workers (int): количество процессов хэширования
+            chunksize (int): размер пачки хэширования и обращения к кэшу
+            cache_size (int): максимальный размер кэша в памяти, 0 – без него
+            **kwargs: параметры нормализатора (например, `country` для
+                телефонов)
+
+        """
+        if kind not in normalizers:
+            raise ValueError('Неизвестный тип значений: {}'.format(kind))
+        getattr(hashlib, algorithm)
+        self.kind = kind
+        self.algorithm = algorithm
+        self.table = Table(str(table)) if table else None
+        self.workers = workers
+        self.chunksize = chunksize
+        self.cache_size = cache_size
+        self.options = kwargs
+        self.key = ':'.join((kind, *('{}={}'.format(*_) for _ in sorted(kwargs.items()))))
+        self._cache: typing.Dict[str, str] = {}
+        self._pool: typing.Union[ProcessPoolExecutor, None] = None
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+        self._pool = None
+
+    def _select(self, prints: typing.List[int], con: engine.Connection) -> typing.Dict[int, str]:
+        """
+        Хэши из кэша в хранилище по отпечаткам
+        """
+        found = {}
+        for i in range(0, len(prints), self.chunksize):
+            found.update(con.execute(text("""
+                select fingerprint, hash
+                from {}
+                where kind = :kind and algorithm = :algorithm 
+                    and fingerprint = any(cast(:prints as bigint[]));
+            """.format(self.table)), {
+                'kind': self.key, 'algorithm': self.algorithm,
+                'prints': '{' + ','.join(map(str, prints[i:i + self.chunksize])) + '}'
+            }).fetchall())
+        return found
+
+    def _insert(self, prints: typing.List[int], hashes: typing.List[str], con: engine.Connection) -> None:
+        """
+        Сохранение хэшей в кэш в хранилище
+        """
+        for i in range(0, len(prints), self.chunksize):
+            con.execute(text("""
+                insert into {} (kind, algorithm, fingerprint, hash)
+                select :kind, :algorithm
+                    , unnest(cast(:prints as bigint[]))
+                    , unnest(cast(:hashes as varchar[]))
+                on conflict do nothing;
+            """.format(self.table)), {
+                'kind': self.key, 'algorithm': self.algorithm,
+                'prints': '{' + ','.join(map(str, prints[i:i + self.chunksize])) + '}',
+                'hashes': '{' + ','.join(hashes[i:i + self.chunksize]) + '}',
+            })
+
+    def __call__(
+        self,
+        values: typing.Iterable,
+        con: typing.Union[engine.Connection, None] = None,
+        connect: typing.Union[typing.Callable, None] = None
+    ) -> pd.Series:
+        """
+        Хэширование значений
+        ====================
+
+        Аргументы:
+            values (typing.Iterable): значения
+            con (sqlalchemy.engine.Connection): подключение к хранилищу – для
+                кэша хэшей в `self.table`
+            connect (typing.Callable): функция подключения к хранилищу –
+                контекстный менеджер (см. `Segmenter.connect`), вызываемый
+                только на время чтения и записи кэша, если `con` не передан
+
+        Возвращает:
+            pd.Series: хэши с индексом `values` – без пропущенных и не
+                прошедших нормализацию значений
+
+        """
+        values = pd.Series(values).dropna()
+        values = normalizers[self.kind](values, **self.options).dropna()
+        if values.empty:
+            return pd.Series(dtype=object)
+
+        codes, unique = pd.factorize(values)
+        unique = unique.tolist()
+        hashes = [self._cache.get(_) for _ in unique]
+        missing = [i for i, _ in enumerate(hashes) if _ is None]
+
+        @contextmanager
+        def _connect() -> typing.Generator[engine.Connection, None, None]:
+            with nullcontext(con) if con is not None else connect() as _con:
+                yield _con
+
+        if missing and self.table is not None and (con is not None or connect):
+            prints = fingerprint(pd.Series([unique[i] for i in missing])).tolist()
+            with _connect() as _con:
+                found = self._select(prints, _con)
+            for i, _ in zip(missing, prints):
+                hashes[i] = found.get(_)
+            store = [(i, _) for i, _ in zip(missing, prints) if hashes[i] is None]
+            missing = [i for i, _ in store]
+        else:
+            store = []
+
+        if missing:
+            if self.workers > 1 and len(missing) > self.chunksize and self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers)
+            computed = hash_values(
+                pd.Series([unique[i] for i in missing], dtype=object),
+                self.algorithm, self._pool, self.chunksize
+            ).tolist()
+            for i, _ in zip(missing, computed):
+                hashes[i] = _
+            if store:
+                with _connect() as _con:
+                    self._insert([_ for i, _ in store], computed, _con)
+
+        if self.cache_size:
+            if len(self._cache) + len(unique) > self.cache_size:
+                self._cache.clear()
+            self._cache.update(zip(unique[:self.cache_size], hashes))
+
+        return pd.Series(np.array(hashes, dtype=object)[codes], index=values.index)
@@ -1,13 +1,21 @@
+from .metrics import Metrics, QueryStats, measure
+from .sink import LogSink
 from .table import Table
+from datetime import datetime
 from io import StringIO
 from re import findall
+from time import perf_counter
 from traceback import format_exc
+from uuid import UUID
 import inspect
 import logging
 import pandas as pd
 import sys
 import typing
 
+_scalars = (str, int, float, datetime, UUID)
+""" Типы параметров, сохраняемые в логовой записи как есть """
+
 class Logger(logging.Logger):
     """
     Система логирования
@@ -21,6 +29,7 @@ class Logger(logging.Logger):
             сообщения перед выводом – использовать только *args параметры
         _log: родительский метод вывода, декорируемый _decorate_log методом
         decorate: декоратор логирования
+        close: запись оставшихся в буфере логовых записей и его остановка
         getChild: реализация метода получения дочернего объекта
         getLevelName: получение наименования уровня логирования
     
@@ -28,9 +37,20 @@ class Logger(logging.Logger):
         id: свойство системы – идентификатор логирования
         table: свойство системы – логовая таблица в хранилище
         fmt: свойство системы – формат сообщения
+        sink: свойство системы – буфер записи в логовую таблицу
+        capture: свойство системы – уровень детализации `decorate` записей
+        metrics: свойство системы – накопленные метрики выполнения действий
     
     """
 
+    CAPTURE = ('off', 'summary', 'full')
+    """ Уровни детализации логовых записей `decorate` декоратора:
+        off – логируются только ошибки, параметры не сохраняются
+        summary – параметры скалярных типов и краткий итог выполнения (тип и
+            размерность результата)
+        full – все параметры и полное описание результата (`DataFrame.info`)
+    """
+
     @property
     def id(self) -> str: return self._id
     """ Идентификатор лога """
@@ -43,6 +63,18 @@ class Logger(logging.Logger):
     def fmt(self) -> str: return self._fmt
     """ Стиль форматирования лога """
 
+    @property
+    def sink(self) -> typing.Union[LogSink, None]: return self._sink
+    """ Буфер записи в логовую таблицу """
+
+    @property
+    def capture(self) -> str: return self._capture
+    """ Уровень детализации логовых записей """
+
+    @property
+    def metrics(self) -> Metrics: return self._metrics
+    """ Метрики выполнения действий """
+
     def __init__(
         self, 
         id: str,
@@ -51,10 +83,16 @@ class Logger(logging.Logger):
         level: int = logging.INFO,
         fmt: str = '[%(name)s] {%(levelname)s} – %(message)s',
         handler: typing.Union[logging.Handler, None] = None, 
-        connect: typing.Union[typing.Callable, None] = None
+        connect: typing.Union[typing.Callable, None] = None,
+        sink: typing.Union[LogSink, None] = None,
+        capture: str = 'full',
+        metrics: typing.Union[Metrics, None] = None
     ) -> None:
         super().__init__(name, level)
 
+        if capture not in self.CAPTURE:
+            raise ValueError(f'Неизвестный уровень детализации: {capture}')
+
         if not handler:
             self._handler = logging.StreamHandler(sys.stdout)
             self._handler.setFormatter(
@@ -67,23 +105,24 @@ class Logger(logging.Logger):
         self._id = id
         self._table = table
         self._fmt = fmt
+        self._sink = sink
+        self._capture = capture
+        self._metrics = metrics or Metrics()
         
         self.info(
             'Инициализировано логирование для {}\n' + '-' * 69, self._id
         )
         
         self.connect: typing.Union[typing.Callable, None] = connect
-        """ Функция подключения к хранилищу данных """
+        """ Функция подключения к хранилищу данных: контекстный менеджер, 
+        принимающий `shared` аргумент – см. `Segmenter.connect` """
 
         if not self.connect:
             self.warning('Не передан метод подключения к хранилищу')
             return
         
-        with self.connect() as con:
-            self._table.data = pd.read_sql_query(
-                'select * from {} limit 0;'.format(self._table), 
-                con
-            )
+        if not self._sink:
+            self._sink = LogSink(self._table, self.connect, self)
 
     def __call__(
         self, 
@@ -108,7 +147,7 @@ class Logger(logging.Logger):
             # if not kwargs.get('repeat'):
             #     self.info(str(locals()).replace('{', '{{').replace('}', '}}'), repeat=True)
 
-            fmt_arg = len(findall('{}', msg))
+            fmt_arg = msg.count('{}')
             func(
                 self,
                 level, 
@@ -133,13 +172,111 @@ class Logger(logging.Logger):
             self.level,
             self._fmt,
             self._handler,
-            self.connect
+            self.connect,
+            self._sink,
+            self._capture,
+            self._metrics
         )
+
+    def close(self) -> None:
+        """
+        Остановка логирования в коллекцию
+        =================================
+
+        Записывает оставшиеся в буфере логовые записи и останавливает его.
+
+        """
+        if self._sink:
+            self._sink.close()
     
     def getLevelName(self) -> str:
         return logging.getLevelName(self.level)
 
-    def decorate(self, func: typing.Callable, *args, **kwargs) -> typing.Callable:
+    @staticmethod
+    def _format_res(data: typing.Any, capture: str = 'full') -> str:
+        """
+        Форматирование результата
+        =========================
+
+        Для датафрейма: вернуть info() строку, читаемую в StringIO буфер
+            строчки датафрейма: вернуть to_string() строку
+            любого другого типа: вернуть str() строку
+        При `capture` = "summary" для датафрейма и серии возвращается только тип
+            и размерность.
+
+        """
+        if isinstance(data, (pd.DataFrame, pd.Series)) and capture != 'full':
+            return '{} {}'.format(type(data).__name__, data.shape)
+        if isinstance(data, pd.DataFrame):
+            with StringIO() as buf:
+                data.info(buf=buf)
+                return buf.getvalue()
+        elif isinstance(data, pd.Series):
+            return '\n'.join((str(type(data)), *data.to_string().splitlines(), ''))
+        else:
+            return str(data)
+
+    @staticmethod
+    def _format_params(
+        signature: inspect.Signature,
+        args: tuple,
+        kwargs: dict,
+        capture: str = 'full'
+    ) -> typing.Dict[str, str]:
+        """
+        Параметры вызова
+        ================
+
+        Сопоставляет аргументы вызова сигнатуре функции (с учетом значений по
+        умолчанию) и возвращает их строковые представления; `con` подключение
+        не сохраняется. При `capture` = "summary" сохраняются только параметры
+        скалярных типов.
+
+        """
+        bound = signature.bind_partial(*args, **kwargs)
+        bound.apply_defaults()
+        params = {}
+        for k, v in bound.arguments.items():
+            kind = signature.parameters[k].kind
+            if kind is inspect.Parameter.VAR_KEYWORD:
+                params.update(v)
+            elif kind is not inspect.Parameter.VAR_POSITIONAL:
+                params[k] = v
+        return {
+            k: str(v) for k, v in params.items() if k != 'con' \
+                and (capture == 'full' or v is None or isinstance(v, _scalars))
+        }
+
+    @staticmethod
+    def _format_stats(
+        started: float, 
+        stats: QueryStats, 
+        data: typing.Any = None
+    ) -> typing.Dict[str, typing.Union[int, float, None]]:
+        """
+        Метрики выполнения
+        ==================
+
+        Время выполнения с момента `started`, счетчики запросов к хранилищу и
+        размер результата: количество строк датафрейма (серии), None – для
+        результатов иных типов.
+
+        """
+        return {
+            'duration': round(perf_counter() - started, 6),
+            'db_duration': round(stats.duration, 6),
+            'db_queries': stats.queries,
+            'db_rows': stats.rows,
+            'rows': len(data) if isinstance(data, (pd.DataFrame, pd.Series)) else None,
+        }
+
+    def decorate(
+        self, 
+        func: typing.Callable, 
+        *args, 
+        connect: bool = True, 
+        **kwargs
+    ) -> typing.Callable:
         """
         Декоратор логирования
         =====================
@@ -152,93 +289,124 @@ class Logger(logging.Logger):
         – в sys.stdout и запись – в логовую коллекцию, после чего возвращает 
         результат выполнения или None – в случае ошибки.
 
-        """
-        def wrapper(
-            *args,
-            func: typing.Callable = func,
-            logger: Logger = self, 
-            **kwargs
-        ) -> typing.Any:
+        Запись в логовую коллекцию выполняется асинхронно: запись ставится в
+        очередь `self.sink` буфера и пишется в коллекцию его фоновым потоком.
 
-            def _format_res(data: typing.Any) -> str:
-                """
-                Форматирование результата
-                =========================
-
-                Для датафрейма: вернуть info() строку, читаемую в StringIO буфер
-                    строчки датафрейма: вернуть to_string() строку
-                    любого другого типа: вернуть str() строку
-
-                """
-                if isinstance(data, pd.DataFrame):
-                    with StringIO() as buf:
-                        data.info(buf=buf)
-                        return buf.getvalue()
-                elif isinstance(data, pd.Series):
-                    return '\n'.join((str(type(data)), *data.to_string().splitlines(), ''))
-                else:
-                    return str(data)
+        Сигнатура и сообщение (первая строка документации) функции определяются
+        один раз при декорировании; объем сохраняемых параметров и описания
+        результата задается `self.capture` уровнем (см. `Logger.CAPTURE`).
 
-            try:
-                ### ... 
-                __flat_locals = {**locals(), **locals().get('kwargs', {})}
-                __signature = {**inspect.signature(func).parameters}
-                __signature_kwargs = {
-                    k: __flat_locals.get(k, None) for k,v in __signature.items() if True \
-                        and not v.default is inspect._empty
-                }
-                __signature_kwargs = {k:(v if v else __signature[k].default) for k,v in __signature_kwargs.items()}
-                __signature_args = {_: __flat_locals.get(_, None) for _ in [
-                    k for k,v in __signature.items() if True \
-                        and v.default is inspect._empty \
-                        and k not in ('kwargs',)
-                        and not k.startswith('__')
-                ]}
-                for i in __flat_locals['args']:
-                    for j in __signature_args:
-                        if __signature_args[j]:
-                            continue
-                        else:
-                            __signature_args[j] = i
-                params = {_[0]: str(_[1]) for _ in (*__signature_args.items(), *__signature_kwargs.items())}
-            except Exception:
-                params = {}
-                logger.warning(format_exc())
+        Запись дополняется временем выполнения функции (`duration`), временем,
+        количеством и затронутыми строками запросов к хранилищу (`db_duration`,
+        `db_queries`, `db_rows` – см. `measure`) и размером результата (`rows`);
+        они же накапливаются в `self.metrics`.
+
+        Корутина декорируется корутиной: она вызывается без подключения к
+        хранилищу (`con` = None) – обращения к нему из цикла событий 
+        блокировали бы остальные задачи. Так же, без подключения, вызывается
+        функция, декорированная с `connect` = False, – например, методы
+        таргетов, занятые сетевыми запросами: удерживаемое на время выгрузки
+        подключение пула простаивало бы.
+
+        """
+        doc = findall('[^ \n]+.+[^ \n]+', func.__doc__ or '')
+        headline = doc[0] if doc else func.__name__
+        try:
+            signature = inspect.signature(func)
+        except (TypeError, ValueError):
+            signature = None
 
-            doc = func.__doc__ if func.__doc__ else ''
-            message = findall('[^ \n]+.+[^ \n]+', doc)[0]
-            log = {
-                **{k:v for k,v in kwargs.items() if k in logger.table.data.columns},
+        def start(logger: Logger, args: tuple, kwargs: dict) -> dict:
+            params = {}
+            if logger.capture != 'off' and signature:
+                try:
+                    params = logger._format_params(signature, args, kwargs, logger.capture)
+                except Exception:
+                    logger.warning(format_exc())
+            return {
+                **{k:v for k,v in kwargs.items() if isinstance(v, _scalars)},
+                'processed': datetime.now(),
                 'id': str(logger.id),
                 'action': func.__name__,
                 'params': str(params),
-                'message': message,
+                'message': headline,
                 'error': None
             }
 
-            data, __data =  None, None
+        def succeed(
+            logger: Logger, 
+            log: dict, 
+            started: float, 
+            stats: QueryStats, 
+            data: typing.Any
+        ) -> None:
+            log.update(logger._format_stats(started, stats, data))
+            if logger.capture != 'off':
+                log.update({
+                    'message': headline + ': ' + logger._format_res(data, logger.capture)
+                })
+                logger.info('{}', log['message'])
+
+        def fail(logger: Logger, log: dict, started: float, stats: QueryStats) -> None:
+            error = format_exc()
+            log.update({
+                'message': headline + ':\n' + error,
+                'error': error, 
+                **logger._format_stats(started, stats)
+            })
+            logger.error('{}', log['message'])
+
+        def finish(logger: Logger, log: dict) -> None:
+            logger.metrics.observe(
+                log['action'], log['duration'], log['db_duration'], 
+                log['db_queries'], log['rows'], bool(log['error'])
+            )
+            if logger.sink and (logger.capture != 'off' or log['error']):
+                logger.sink.put(log)
+
+        if inspect.iscoroutinefunction(func):
+            async def async_wrapper(
+                *args,
+                func: typing.Callable = func,
+                logger: Logger = self,
+                **kwargs
+            ) -> typing.Any:
+                log, data, __data = start(logger, args, kwargs), None, None
+                started = perf_counter()
+                try:
+                    with measure() as stats:
+                        data, *__data = await func(*args, con=None, **kwargs)
+                    succeed(logger, log, started, stats, data)
+                except Exception:
+                    data = None
+                    fail(logger, log, started, stats)
+                finally:
+                    finish(logger, log)
+                    return __data[0] if __data and __data[0] is not None else data
+
+            return async_wrapper
+
+        def wrapper(
+            *args,
+            func: typing.Callable = func,
+            logger: Logger = self, 
+            **kwargs
+        ) -> typing.Any:
+            log, data, __data = start(logger, args, kwargs), None, None
+            started = perf_counter()
             try:
-                if logger.connect:
-                    with logger.connect() as con:
-                        data, *__data = func(*args, con=con, **kwargs)
-                message += ': ' + _format_res(data)
-                log.update({'message': message})
-                logger.info(message)
+                with measure() as stats:
+                    if logger.connect and connect:
+                        with logger.connect() as con:
+                            data, *__data = func(*args, con=con, **kwargs)
+                    else:
+                        data, *__data = func(*args, con=None, **kwargs)
+                succeed(logger, log, started, stats, data)
             except Exception:
                 data = None
-                message += ':\n' + format_exc()
-                log.update({'error':format_exc()})
-                logger.error(message)
+                fail(logger, log, started, stats)
             finally:
-                if logger.connect:
-                    with logger.connect() as con:
-                        pd.DataFrame((log,)).to_sql(
-                            name=logger.table.table,
-                            con=con, 
-                            schema=logger.table.schema,
-                            if_exists='append',
-                            index=False
-                        )
-                return __data[0] if __data else data
-
-        return wrapper
\ No newline at end of file
+                finish(logger, log)
+                return __data[0] if __data and __data[0] is not None else data
+
+        return wrapper
@@ -1,78 +1,164 @@
-# from .. import updaters
-# from .table import Table
-# from .target import Target
-# from sqlalchemy import engine
-# import typing
-# import pandas as pd
-
-# class Manager:
-#     """
-#     Менеджер
-#     ========
-
-#     Объект, содержащий методы взаимодействия с потребителем сегментов.
-#     Конфигурируется через public.segmenter_consumers коллекцию.
-
-#     Методы:
-#         ###
-        
-#     Свойства:
-#         id: идентификатор потребителя в хранилище данных
-#         targets: перечень актуальных для потребителя таргетов
-
-#     """
-
-#     def __init__(
-#         self,
-#         id: str,
-#         targets: dict,
-#         table: Table = None,
-#         connect: engine.Connection = None
-#     ) -> None:
-#         self._id = id
-#         self.table = table
-        
-#         if not connect:
-#             self.warning('Не передан метод подключения к хранилищу')
-#             return
-#         self.connect = connect
-
-#         if self.connect:
-#             with self.connect() as con:
-#                 self.table = pd.read_sql("""
-#                     select update_consumer as id
-#                          , update_target as target
-#                          , update_name as name
-#                          , update_params as params
-#                          , update_cron as cron
-#                          , udpate_remove as remove
-#                     from segmenter
-#                     where update_consumer = '{id}';
-#                 """.format(id=id), con)
-
-#         # df['update_name'] = df.apply(lambda x: x['update_name'].format(**x.to_dict()), axis=1)
-
-#         self._targets = {
-#             k: vars(updaters)[k](**v) for k, v in targets
-#         }
-
-#     @property
-#     def id(self) -> str: return self._id
-
-#     @property
-#     def targets(self) -> typing.Dict[str, Target]: return self._targets
-
-#     # def create(self):
-#     #     pass
-    
-#     # def parse(self):
-#     #     pass
-
-#     # def remove(self):
-#     #     pass
-    
-#     # def select(self):
-#     #     pass
-    
-#     # def update(self):
-#     #     pass
\ No newline at end of file
+from .logger import Logger
+from .target import AsyncTarget, Target
+from .throttle import HostLimits
+import asyncio
+import inspect
+import pandas as pd
+import typing
+
+class Manager:
+    """
+    Менеджер
+    ========
+
+    Объект, содержащий таргеты потребителя сегментов: таргеты создаются при
+    первом обращении по параметрам потребителя вида {таргет: параметры
+    таргета}; класс таргета определяется `engine` параметром или
+    наименованием таргета (см. `updaters.targets`).
+
+    Выгрузка сегментов в таргеты всех потребителей выполняется `fan_out`
+    конвейером: каждый сегмент читается из хранилища один раз.
+
+    Методы:
+        target: таргет потребителя по наименованию
+        close: закрытие сессий таргетов
+        aclose: закрытие ресурсов асинхронных таргетов в текущем цикле событий
+
+    Свойства:
+        id: идентификатор потребителя в хранилище данных
+        targets: созданные таргеты потребителя
+
+    """
+
+    def __init__(
+        self,
+        id: str,
+        targets: typing.Dict[str, dict],
+        logger: Logger,
+        limits: typing.Union[HostLimits, None] = None
+    ) -> None:
+        """
+        Аргументы:
+            id (str): идентификатор потребителя
+            targets (dict): параметры таргетов потребителя
+            logger (Logger): логгер сегментера
+            limits (HostLimits): общий ограничитель одновременных запросов
+                асинхронных таргетов к хостам
+
+        """
+        self._id = str(id)
+        self.params = targets or {}
+        self.logger = logger
+        self.limits = limits
+        self._targets: typing.Dict[str, Target] = {}
+
+    @property
+    def id(self) -> str: return self._id
+
+    @property
+    def targets(self) -> typing.Dict[str, Target]: return self._targets
+
+    def target(self, name: str) -> typing.Union[Target, None]:
+        """
+        Таргет потребителя
+        ==================
+
+        Возвращает:
+            Target: таргет или None – при отсутствии параметров или класса
+
+        """
+        name = str(name)
+        if name not in self._targets:
+            from ..updaters import targets
+
+            params = {**self.params.get(name, {})}
+            cls = targets.get(params.pop('engine', name))
+            if not params or not cls:
+                self.logger.warning(
+                    'Не определен таргет {} потребителя {}', name, self._id
+                )
+                return None
+            if issubclass(cls, AsyncTarget) and self.limits:
+                params.setdefault('limits', self.limits)
+            self._targets[name] = cls(self.logger.getChild(name), **params)
+        return self._targets[name]
+
+    def close(self) -> None:
+        for _ in self._targets.values():
+            getattr(_, 'close', lambda: None)()
+
+    async def aclose(self) -> None:
+        for _ in self._targets.values():
+            if isinstance(_, AsyncTarget):
+                await _.aclose()
+
+async def fan_out(
+    chunks: typing.Iterator[pd.DataFrame],
+    sinks: typing.List[typing.Tuple[Target, str, dict]],
+    maxsize: int = 2
+) -> typing.List[typing.Union[typing.Tuple[int, int], None]]:
+    """
+    Выгрузка сегмента во все таргеты
+    ================================
+
+    Читает пачки изменений аудитории (см. `audience_deltas`) один раз – в
+    отдельном потоке – и раздает каждую всем `sinks` выгрузкам (таргет,
+    аудитория, параметры) через очереди по `maxsize` пачек. Выгрузки
+    выполняются параллельно: асинхронные таргеты – в цикле событий,
+    синхронные – в отдельных потоках. Чтение следующей пачки ожидает
+    освобождения места во всех очередях, поэтому медленный таргет
+    приостанавливает чтение, а не накапливает сегмент в памяти.
+
+    Ошибка выгрузки прекращает отправку в ее таргет; остальные таргеты
+    получают сегмент целиком.
+
+    Аргументы:
+        chunks (typing.Iterator[pd.DataFrame]): пачки изменений с атрибутами
+            `id` и `change` ("added" или "removed")
+        sinks (list): выгрузки – кортежи (таргет, аудитория, параметры)
+        maxsize (int): количество пачек в очереди каждой выгрузки
+
+    Возвращает:
+        list: количества добавленных и удаленных идентификаторов по каждой
+            выгрузке, None – в случае ошибки выгрузки
+
+    """
+    queues = [asyncio.Queue(maxsize) for _ in sinks]
+
+    async def _call(method: typing.Callable, **kwargs) -> typing.Any:
+        if inspect.iscoroutinefunction(method):
+            return await method(**kwargs)
+        return await asyncio.to_thread(method, **kwargs)
+
+    async def _sink(queue: asyncio.Queue, target: Target, audience: str, params: dict) -> typing.Union[tuple, None]:
+        added, removed, failed = 0, 0, False
+        while (chunk := await queue.get()) is not None:
+            if failed:
+                continue
+            for change, ids in chunk.groupby('change').id:
+                method = target.update if change == 'added' else target.remove
+                if await _call(method, audience=audience, ids=ids, **params) is None:
+                    failed = True
+                    break
+                if change == 'added':
+                    added += len(ids)
+                else:
+                    removed += len(ids)
+        return None if failed else (added, removed)
+
+    async def _read() -> None:
+        try:
+            while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                await asyncio.gather(*(_.put(chunk) for _ in queues))
+        finally:
+            for _ in queues:
+                await _.put(None)
+
+    tasks = [asyncio.ensure_future(_sink(q, *s)) for q, s in zip(queues, sinks)]
+    try:
+        await _read()
+    except BaseException:
+        for _ in tasks:
+            _.cancel()
+        raise
+    return [*await asyncio.gather(*tasks)]
@@ -0,0 +1,110 @@
+from .sql import read_frame
+from .table import Table
+from sqlalchemy import engine
+from threading import Lock
+from time import monotonic
+import pandas as pd
+import typing
+
+class Catalog:
+    """
+    Кэш метаданных коллекций
+    ========================
+
+    Объект получает наличие и перечень атрибутов коллекций из системного
+    каталога хранилища, не обращаясь к данным коллекций, и кэширует их на
+    `ttl` секунд. Используется общим для процесса экземпляром `catalog`.
+
+    Методы:
+        columns: перечень атрибутов коллекции и их типов
+        exists: проверка наличия коллекции
+        frame: пустой датафрейм с атрибутами коллекции и соответствующими их
+            типам типами данных
+        invalidate: сброс кэша для коллекции или всего кэша
+
+    Свойства:
+        ttl: время жизни записи кэша в секундах, None – без ограничения
+
+    """
+
+    _dtypes = {
+        'smallint': 'Int64', 'integer': 'Int64', 'bigint': 'Int64',
+        'real': 'float64', 'double precision': 'float64', 'numeric': 'float64',
+        'boolean': 'boolean',
+        'date': 'datetime64[ns]', 'timestamp without time zone': 'datetime64[ns]',
+    }
+    """ Соответствие типов хранилища типам данных pandas """
+
+    def __init__(self, ttl: typing.Union[float, None] = 300) -> None:
+        self.ttl = ttl
+        self._lock = Lock()
+        self._cache: typing.Dict[str, typing.Tuple[float, pd.DataFrame]] = {}
+
+    def columns(self, table: Table, con: engine.Connection) -> pd.DataFrame:
+        """
+        Перечень атрибутов коллекции
+        ============================
+
+        Возвращает:
+            pd.core.frame.DataFrame: датафрейм с атрибутами `column_name` и
+                `data_type`, пустой – при отсутствии коллекции
+
+        """
+        key = str(table)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached and (self.ttl is None or monotonic() - cached[0] < self.ttl):
+            return cached[1]
+
+        data = read_frame("""
+            select a.attname as column_name
+                , format_type(a.atttypid, a.atttypmod) as data_type
+            from pg_catalog.pg_attribute a
+            where true
+                and a.attrelid = to_regclass(:table)
+                and a.attnum > 0
+                and not a.attisdropped
+            order by a.attnum;
+        """, con, {'table': key})
+
+        with self._lock:
+            self._cache[key] = (monotonic(), data)
+        return data
+
+    def exists(self, table: Table, con: engine.Connection) -> bool:
+        """
+        Проверка наличия коллекции
+        ==========================
+
+        """
+        return not self.columns(table, con).empty
+
+    def frame(self, table: Table, con: engine.Connection) -> pd.DataFrame:
+        """
+        Пустой датафрейм коллекции
+        ==========================
+
+        """
+        return pd.DataFrame({
+            _.column_name: pd.Series(dtype=self._dtypes.get(_.data_type.split('(')[0], 'object'))
+                for _ in self.columns(table, con).itertuples(index=False)
+        })
+
+    def invalidate(self, table: typing.Union[Table, str, None] = None) -> None:
+        """
+        Сброс кэша
+        ==========
+
+        Аргументы:
+            table (Table): коллекция, метаданные которой необходимо сбросить,
+                None – для сброса всего кэша
+
+        """
+        with self._lock:
+            if table is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(str(table), None)
+
+catalog = Catalog()
+""" Общий для процесса кэш метаданных коллекций """
@@ -0,0 +1,180 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from os import replace
+from sqlalchemy import engine, event
+from threading import Lock
+from time import perf_counter
+import typing
+
+class QueryStats:
+    """
+    Счетчики запросов к хранилищу
+    =============================
+
+    Накапливает время выполнения, количество запросов и затронутых ими строк
+    в рамках `measure()` контекста.
+
+    Свойства:
+        duration: суммарное время выполнения запросов, в секундах
+        queries: количество запросов
+        rows: количество затронутых (полученных) запросами строк
+
+    """
+
+    __slots__ = ('duration', 'queries', 'rows')
+
+    def __init__(self) -> None:
+        self.duration = 0.0
+        self.queries = 0
+        self.rows = 0
+
+    def add(self, other: 'QueryStats') -> None:
+        self.duration += other.duration
+        self.queries += other.queries
+        self.rows += other.rows
+
+_stats: ContextVar[typing.Union[QueryStats, None]] = ContextVar('_stats', default=None)
+""" Счетчики текущего `measure()` контекста """
+
+def _before_cursor_execute(con, cursor, statement, parameters, context, executemany) -> None:
+    if _stats.get() is not None:
+        con.info.setdefault('_query_start', []).append(perf_counter())
+
+def _after_cursor_execute(con, cursor, statement, parameters, context, executemany) -> None:
+    stats = _stats.get()
+    if stats is None or not con.info.get('_query_start'):
+        return
+    stats.duration += perf_counter() - con.info['_query_start'].pop()
+    stats.queries += 1
+    stats.rows += max(getattr(cursor, 'rowcount', 0) or 0, 0)
+
+def track_queries(sql_eng: engine.Engine) -> None:
+    """
+    Подписка на выполнение запросов
+    ===============================
+
+    Подписывает счетчики `measure()` контекстов на выполнение запросов через
+    подключения движка. Запросы, выполняемые напрямую через DBAPI курсор
+    (например, `copy_expert`), не учитываются.
+
+    """
+    if not event.contains(sql_eng, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(sql_eng, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(sql_eng, 'after_cursor_execute', _after_cursor_execute)
+
+@contextmanager
+def measure() -> typing.Generator[QueryStats, typing.Any, None]:
+    """
+    Замер запросов к хранилищу
+    ==========================
+
+    Возвращает счетчики запросов, выполненных внутри контекста в текущем
+    потоке (задаче); по выходе из вложенного контекста его счетчики
+    добавляются к внешнему.
+
+        with measure() as stats:
+            ...
+        stats.duration, stats.queries, stats.rows
+
+    """
+    parent, stats = _stats.get(), QueryStats()
+    token = _stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _stats.reset(token)
+        if parent is not None:
+            parent.add(stats)
+
+class Metrics:
+    """
+    Метрики выполнения
+    ==================
+
+    Накапливает по каждому действию (декорированной функции) количество
+    вызовов и ошибок, суммарное время выполнения, время запросов к хранилищу и
+    размер результатов, и выгружает их в текстовом формате Prometheus.
+
+    Методы:
+        observe: учет выполнения действия
+        snapshot: накопленные метрики по действиям
+        render: метрики в текстовом формате Prometheus
+        export: запись метрик в файл
+
+    """
+
+    _metrics = (
+        ('calls', 'counter', 'Количество вызовов'),
+        ('errors', 'counter', 'Количество ошибок'),
+        ('duration', 'counter', 'Суммарное время выполнения, с'),
+        ('db_duration', 'counter', 'Суммарное время запросов к хранилищу, с'),
+        ('db_queries', 'counter', 'Количество запросов к хранилищу'),
+        ('rows', 'counter', 'Суммарный размер результатов'),
+        ('last_duration', 'gauge', 'Время последнего выполнения, с'),
+    )
+    """ Метрики действий: наименование, тип и описание """
+
+    def __init__(self, prefix: str = 'segmenter') -> None:
+        self.prefix = prefix
+        self._lock = Lock()
+        self._actions: typing.Dict[str, typing.Dict[str, float]] = {}
+
+    def observe(
+        self,
+        action: str,
+        duration: float,
+        db_duration: float = 0.0,
+        db_queries: int = 0,
+        rows: typing.Union[int, None] = None,
+        error: bool = False
+    ) -> None:
+        with self._lock:
+            _ = self._actions.setdefault(action, {name: 0 for name, *__ in self._metrics})
+            _['calls'] += 1
+            _['errors'] += int(error)
+            _['duration'] += duration
+            _['db_duration'] += db_duration
+            _['db_queries'] += db_queries
+            _['rows'] += rows or 0
+            _['last_duration'] = duration
+
+    def snapshot(self) -> typing.Dict[str, typing.Dict[str, float]]:
+        with self._lock:
+            return {k: dict(v) for k, v in self._actions.items()}
+
+    def render(self, pool: typing.Union[typing.Dict[str, float], None] = None) -> str:
+        """
+        Метрики в текстовом формате Prometheus
+        ======================================
+
+        Аргументы:
+            pool (dict): метрики пула подключений (см. `PoolMetrics.snapshot`)
+
+        """
+        actions, lines = self.snapshot(), []
+        for name, kind, doc in self._metrics:
+            metric = f'{self.prefix}_action_{name}'
+            lines += [f'# HELP {metric} {doc}', f'# TYPE {metric} {kind}']
+            lines += [
+                f'{metric}{{action="{action}"}} {values[name]:g}'
+                    for action, values in sorted(actions.items())
+            ]
+        for name, value in (pool or {}).items():
+            if value is None:
+                continue
+            metric = f'{self.prefix}_pool_{name}'
+            lines += [f'# TYPE {metric} gauge', f'{metric} {value:g}']
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str, pool: typing.Union[typing.Dict[str, float], None] = None) -> None:
+        """
+        Запись метрик в файл
+        ====================
+
+        Файл заменяется целиком, поэтому читающий его сборщик метрик не увидит
+        частично записанного содержимого.
+
+        """
+        with open(path + '.tmp', 'w') as f:
+            f.write(self.render(pool))
+        replace(path + '.tmp', path)
@@ -0,0 +1,87 @@
+from sqlalchemy import engine, event
+from threading import Lock
+from time import perf_counter
+import typing
+
+class PoolMetrics:
+    """
+    Метрики пула подключений
+    ========================
+
+    Объект подписывается на события пула подключений SQLAlchemy движка и
+    накапливает счетчики его использования.
+
+    Методы:
+        __init__: инициализация объекта и подписка на события пула
+        snapshot: получение текущего состояния пула и накопленных счетчиков
+
+    Свойства:
+        connects: количество установленных DBAPI подключений
+        checkouts: количество выдач подключений из пула
+        checkins: количество возвратов подключений в пул
+        invalidations: количество инвалидированных подключений
+        peak: максимальное количество одновременно выданных подключений
+        held: суммарное время удержания подключений, в секундах
+
+    """
+
+    def __init__(self, sql_eng: engine.Engine) -> None:
+        self._pool = sql_eng.pool
+        self._lock = Lock()
+        self._checked_out: typing.Dict[int, float] = {}
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.peak = 0
+        self.held = 0.0
+
+        event.listen(self._pool, 'connect', self._on_connect)
+        event.listen(self._pool, 'checkout', self._on_checkout)
+        event.listen(self._pool, 'checkin', self._on_checkin)
+        event.listen(self._pool, 'invalidate', self._on_invalidate)
+
+    def _on_connect(self, dbapi_con, con_record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_con, con_record, con_proxy) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self._checked_out[id(con_record)] = perf_counter()
+            self.peak = max(self.peak, len(self._checked_out))
+
+    def _on_checkin(self, dbapi_con, con_record) -> None:
+        with self._lock:
+            self.checkins += 1
+            started = self._checked_out.pop(id(con_record), None)
+            if started is not None:
+                self.held += perf_counter() - started
+
+    def _on_invalidate(self, dbapi_con, con_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> typing.Dict[str, typing.Union[int, float]]:
+        """
+        Состояние пула
+        ==============
+
+        Возвращает:
+            dict: размер пула, количество свободных, выданных и сверхлимитных
+                подключений, а также накопленные счетчики событий пула
+
+        """
+        with self._lock:
+            return {
+                'size': getattr(self._pool, 'size', lambda: None)(),
+                'checked_in': getattr(self._pool, 'checkedin', lambda: None)(),
+                'checked_out': len(self._checked_out),
+                'overflow': getattr(self._pool, 'overflow', lambda: None)(),
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'peak': self.peak,
+                'held': round(self.held, 6),
+            }
@@ -0,0 +1,145 @@
+from .metadata import catalog
+from .table import Table
+from queue import Empty, Queue
+from sqlalchemy import column, insert, table
+from threading import Thread
+from time import monotonic
+from traceback import format_exc
+import atexit
+import logging
+import typing
+
+class LogSink:
+    """
+    Буфер логовых записей
+    =====================
+
+    Объект принимает логовые записи в ограниченную очередь и записывает их в
+    логовую коллекцию пачками – многострочными insert запросами – из фонового
+    потока. Пачка записывается при накоплении `batch` записей или по истечении
+    `interval` секунд с момента поступления первой из них; при переполнении
+    очереди вызывающий поток ожидает освобождения места в ней.
+
+    Методы:
+        __init__: инициализация буфера и запуск фонового потока
+        put: постановка записи в очередь
+        flush: синхронная запись всех поставленных в очередь записей
+        close: запись оставшихся записей и остановка фонового потока
+
+    Свойства:
+        table: логовая таблица в хранилище
+        connect: функция подключения к хранилищу данных
+
+    """
+
+    __stop = object()
+    """ Маркер остановки фонового потока """
+
+    __flush = object()
+    """ Маркер немедленной записи накопленных записей """
+
+    def __init__(
+        self,
+        table: Table,
+        connect: typing.Callable,
+        logger: logging.Logger,
+        maxsize: int = 10000,
+        batch: int = 500,
+        interval: float = 1.0
+    ) -> None:
+        self.table = table
+        self.connect = connect
+        self._logger = logger
+        self._queue: Queue = Queue(maxsize=maxsize)
+        self._batch = batch
+        self._interval = interval
+        self._thread = Thread(target=self._run, name='LogSink', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, record: typing.Dict[str, typing.Any]) -> None:
+        """
+        Постановка записи в очередь
+        ===========================
+
+        """
+        if not self._thread.is_alive():
+            self._write([record])
+            return
+        self._queue.put(record)
+
+    def flush(self) -> None:
+        """
+        Синхронная запись очереди
+        =========================
+
+        Записывает накопленные записи, не дожидаясь `interval`, и ожидает записи
+        всех поставленных в очередь на момент вызова записей.
+
+        """
+        if self._thread.is_alive():
+            self._queue.put(self.__flush)
+            self._queue.join()
+
+    def close(self) -> None:
+        """
+        Остановка буфера
+        ================
+
+        Записывает оставшиеся в очереди записи и останавливает фоновый поток.
+
+        """
+        if not self._thread.is_alive():
+            return
+        self._queue.put(self.__stop)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self) -> None:
+        """
+        Фоновый поток: накопление и запись пачек
+        """
+        records, deadline, stop = [], None, False
+        while not stop:
+            timeout = None if deadline is None else max(0, deadline - monotonic())
+            try:
+                record = self._queue.get(timeout=timeout)
+            except Empty:
+                record = None
+            force = record is self.__stop or record is self.__flush
+            if record is self.__stop:
+                stop = True
+            elif record is not None and not force:
+                records.append(record)
+                deadline = deadline or monotonic() + self._interval
+            if records and (force or len(records) >= self._batch or monotonic() >= deadline):
+                self._write(records)
+                for _ in records:
+                    self._queue.task_done()
+                records, deadline = [], None
+            if force:
+                self._queue.task_done()
+
+    def _write(self, records: typing.List[typing.Dict[str, typing.Any]]) -> None:
+        """
+        Запись пачки многострочными insert запросами – по одному на каждый
+        набор атрибутов записей; атрибуты логовой таблицы читаются при первой
+        записи
+        """
+        try:
+            with self.connect(shared=False) as con:
+                if self.table.data is None or self.table.data.columns.empty:
+                    self.table.data = catalog.frame(self.table, con)
+                columns = set(self.table.data.columns)
+                groups: typing.Dict[tuple, list] = {}
+                for _ in records:
+                    _ = {k: v for k, v in _.items() if k in columns}
+                    groups.setdefault(tuple(_), []).append(_)
+                for keys, rows in groups.items():
+                    con.execute(insert(
+                        table(self.table.table, *map(column, keys), schema=self.table.schema)
+                    ).values(rows))
+        except Exception:
+            self._logger.warning(
+                'Не удалось записать {} логовых записей:\n{}', len(records), format_exc()
+            )
@@ -0,0 +1,139 @@
+from hashlib import sha1
+from sqlalchemy import engine, text
+from time import monotonic
+import pandas as pd
+import typing
+
+_columns: typing.Dict[str, typing.Tuple[float, typing.Tuple[str, ...]]] = {}
+""" Кэш перечней атрибутов запросов вида {хэш текста запроса: (момент
+получения, атрибуты)} """
+
+def describe(
+    sql: str,
+    con: engine.Connection,
+    cache: bool = True,
+    ttl: typing.Union[float, None] = 300
+) -> typing.List[str]:
+    """
+    Перечень атрибутов запроса
+    ==========================
+
+    Функция возвращает перечень атрибутов результата запроса без его
+    выполнения: запрос оборачивается в `select * ... limit 0` и возвращает
+    только метаданные результата. Перечень кэшируется по хэшу текста запроса
+    на `ttl` секунд (как и метаданные коллекций `Catalog`), поэтому повторные
+    вызовы не обращаются к хранилищу, а изменения атрибутов таблиц запроса
+    учитываются не позднее истечения срока. Кэш запросов измененных сегментов
+    сбрасывается `Segmenter.reload` (см. `forget`).
+
+    Аргументы:
+        sql (str): произвольный SQL запрос на получение данных
+        con (sqlalchemy.engine.Connection): SQLalchemy подключение
+        cache (bool): использовать ли кэш перечней атрибутов
+        ttl (float): время жизни записи кэша в секундах, None – без
+            ограничения
+
+    Возвращает:
+        list: перечень атрибутов результата запроса
+
+    """
+    sql = sql.strip().rstrip(';')
+    key = sha1(sql.encode()).hexdigest()
+
+    cached = _columns.get(key) if cache else None
+    if not cached or ttl is not None and monotonic() - cached[0] >= ttl:
+        result = con.execute(text('select * from ({}) _ limit 0;'.format(sql)))
+        _columns[key] = cached = (monotonic(), tuple(result.keys()))
+        result.close()
+
+    return [*cached[1]]
+
+def forget(sql: typing.Union[str, None] = None) -> None:
+    """
+    Сброс кэша перечней атрибутов
+    =============================
+
+    Аргументы:
+        sql (str): запрос, перечень атрибутов которого необходимо сбросить,
+            None – для сброса всего кэша
+
+    """
+    if sql is None:
+        _columns.clear()
+    else:
+        _columns.pop(sha1(sql.strip().rstrip(';').encode()).hexdigest(), None)
+
+_dtypes = {
+    16: 'boolean',
+    20: 'Int64', 21: 'Int64', 23: 'Int64',
+    700: 'float64', 701: 'float64', 1700: 'float64',
+}
+""" Типы данных pandas по OID типов хранилища – одинаковые для всех пачек 
+независимо от пропусков в них; остальные типы определяются pandas """
+
+def stream_results(
+    sql: typing.Any,
+    con: engine.Connection,
+    params: typing.Union[dict, None] = None,
+    chunksize: int = 100000,
+    dtype: typing.Union[dict, None] = None
+) -> typing.Generator[pd.DataFrame, None, None]:
+    """
+    Потоковое чтение результата запроса
+    ===================================
+
+    Функция-генератор выполняет запрос курсором на стороне хранилища 
+    (`stream_results`) и возвращает результат пачками по `chunksize` записей,
+    поэтому на стороне клиента одновременно находится не больше одной пачки.
+    Целочисленные, логические и дробные атрибуты приводятся к типам pandas
+    по типам результата (см. `_dtypes`), остальные – по `dtype`. Для пустого
+    результата возвращается одна пустая пачка с атрибутами результата.
+
+    Курсор на стороне хранилища существует только внутри транзакции, поэтому
+    подключение должно оставаться открытым до окончания чтения.
+
+    Аргументы:
+        sql (str): SQL запрос на получение данных
+        con (sqlalchemy.engine.Connection): SQLalchemy подключение
+        params (dict): параметры запроса
+        chunksize (int): размер пачки
+        dtype (dict): типы данных атрибутов вида {атрибут: тип}
+
+    Возвращает:
+        typing.Generator[pd.DataFrame, None, None]: пачки записей
+
+    """
+    result = con.execution_options(stream_results=True, max_row_buffer=chunksize).execute(
+        text(sql) if isinstance(sql, str) else sql, params or {}
+    )
+    try:
+        columns = [*result.keys()]
+        types = {
+            _[0]: _dtypes[_[1]] for _ in (result.cursor.description or []) if _[1] in _dtypes
+        }
+        types.update(dtype or {})
+        empty = True
+        while rows := result.fetchmany(chunksize):
+            empty = False
+            yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True).astype(types)
+        if empty:
+            yield pd.DataFrame(columns=columns).astype(types)
+    finally:
+        result.close()
+
+def read_frame(
+    sql: typing.Any,
+    con: engine.Connection,
+    params: typing.Union[dict, None] = None,
+    chunksize: int = 100000,
+    dtype: typing.Union[dict, None] = None
+) -> pd.DataFrame:
+    """
+    Чтение результата запроса
+    =========================
+
+    Собирает датафрейм из пачек `stream_results` – без буферизации всего
+    результата драйвером хранилища.
+
+    """
+    return pd.concat(stream_results(sql, con, params, chunksize, dtype), ignore_index=True)
@@ -31,7 +31,7 @@ class Table(namedtuple('Table', ['schema', 'table'])):
     @property
     def columns(self) -> typing.Union[list, None]: 
         """Перечень атрибутов коллекции"""
-        return self.data.columns.tolist() if self.data else None
+        return self.data.columns.tolist() if self.data is not None else None
         
     def __new__(cls, table: str, default_schema: str = 'public'):
         return None if not table else super(Table, cls).__new__(
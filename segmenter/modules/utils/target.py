@@ -6,11 +6,115 @@ class Target:
     """
     Таргет
     ======
-    
-    Абстрактный класс, содержащий методы взаимодействия с таргетом.
+
+    Абстрактный класс, содержащий методы взаимодействия с таргетом – внешней
+    системой, в которую выгружаются аудитории сегментов. Методы декорируются
+    `logger.decorate(...)` методом, поэтому принимают `con` аргумент и
+    возвращают кортеж (результат, значение) – см. `Logger.decorate`. Методы
+    заняты сетевыми запросами, поэтому вызываются без подключения к хранилищу
+    (`con` = None): таргет, обращающийся к хранилищу, получает подключение
+    через `self.logger.connect` только на время обращения.
+
+    Разбор ответов (`parse`) не декорируется и возвращает датафрейм.
 
     Методы:
-        ...
+        create: создание аудитории, возвращает ее идентификатор
+        parse: приведение ответа таргета к датафрейму аудиторий
+        remove: удаление идентификаторов из аудитории
+        select: получение перечня аудиторий – датафрейма с атрибутами `id` и
+            `name`
+        update: добавление идентификаторов в аудиторию
+        audience: идентификатор аудитории по наименованию – существующей или
+            созданной
+        size: размер аудитории по данным таргета
+
+    """
+    def __init__(
+        self,
+        logger: Logger,
+        **kwargs
+    ) -> None:
+        self.logger = logger
+        self.select = logger.decorate(self.select, connect=False)
+        self.update = logger.decorate(self.update, connect=False)
+        self.create = logger.decorate(self.create, connect=False)
+        self.remove = logger.decorate(self.remove, connect=False)
+
+    def create(self, name: str, con: typing.Any = None, **kwargs) -> typing.Tuple[typing.Any, str]:
+        raise NotImplementedError
+
+    def parse(self, data: typing.Any, **kwargs) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def remove(
+        self,
+        audience: str,
+        ids: pd.Series,
+        con: typing.Any = None,
+        **kwargs
+    ) -> typing.Tuple[pd.DataFrame, None]:
+        raise NotImplementedError
+
+    def select(self, con: typing.Any = None, **kwargs) -> typing.Tuple[pd.DataFrame, None]:
+        raise NotImplementedError
+
+    def update(
+        self,
+        audience: str,
+        ids: pd.Series,
+        con: typing.Any = None,
+        **kwargs
+    ) -> typing.Tuple[pd.DataFrame, None]:
+        raise NotImplementedError
+
+    def audience(self, name: str, **kwargs) -> typing.Union[str, None]:
+        """
+        Идентификатор аудитории
+        =======================
+
+        Ищет аудиторию по наименованию среди `self.select()` и создает ее при
+        отсутствии.
+
+        Возвращает:
+            str: идентификатор аудитории или None – в случае ошибки
+
+        """
+        audiences = self.select(**kwargs)
+        if audiences is None:
+            return None
+        found = audiences[audiences.name == name]
+        if not found.empty:
+            return str(found.id.iloc[0])
+        return self.create(name=name, **kwargs)
+
+    def size(self, audience: str, **kwargs) -> typing.Union[int, None]:
+        """
+        Размер аудитории
+        ================
+
+        Возвращает:
+            int: размер аудитории по `size` атрибуту `self.select()` или None –
+                если таргет его не сообщает
+
+        """
+        audiences = self.select(**kwargs)
+        if audiences is None or 'size' not in audiences.columns:
+            return None
+        found = audiences[audiences.id.astype(str) == str(audience)]['size']
+        return None if found.empty or pd.isna(found.iloc[0]) else int(found.iloc[0])
+
+class AsyncTarget(Target):
+    """
+    Асинхронный таргет
+    ==================
+
+    Таргет, методы которого – корутины: выгрузка аудиторий множества
+    подписок выполняется конкурентно в одном цикле событий (см. 
+    `Segmenter.update_audiences`). Методы декорируются `logger.decorate(...)`
+    так же, как у `Target`, – корутинами.
+
+    Методы:
+        aclose: закрытие ресурсов, привязанных к текущему циклу событий
 
     """
     def __init__(
@@ -19,27 +123,64 @@ class Target:
         **kwargs
     ) -> None:
         self.logger = logger
-        self.parse = logger.decorate(self.parse)
         self.select = logger.decorate(self.select)
         self.update = logger.decorate(self.update)
         self.create = logger.decorate(self.create)
         self.remove = logger.decorate(self.remove)
 
-    def create(self):
-        pass
-    
-    def parse(self):
-        pass
+    async def create(self, name: str, con: typing.Any = None, **kwargs) -> typing.Tuple[typing.Any, str]:
+        raise NotImplementedError
 
-    def remove(self):
-        pass
-    
-    def select(self):
-        pass
-    
-    def update(self):
-        pass
+    async def remove(
+        self,
+        audience: str,
+        ids: pd.Series,
+        con: typing.Any = None,
+        **kwargs
+    ) -> typing.Tuple[pd.DataFrame, None]:
+        raise NotImplementedError
+
+    async def select(self, con: typing.Any = None, **kwargs) -> typing.Tuple[pd.DataFrame, None]:
+        raise NotImplementedError
+
+    async def update(
+        self,
+        audience: str,
+        ids: pd.Series,
+        con: typing.Any = None,
+        **kwargs
+    ) -> typing.Tuple[pd.DataFrame, None]:
+        raise NotImplementedError
 
+    async def audience(self, name: str, **kwargs) -> typing.Union[str, None]:
+        """
+        Идентификатор аудитории
+        =======================
 
+        См. `Target.audience`.
 
-    
+        """
+        audiences = await self.select(**kwargs)
+        if audiences is None:
+            return None
+        found = audiences[audiences.name == name]
+        if not found.empty:
+            return str(found.id.iloc[0])
+        return await self.create(name=name, **kwargs)
+
+    async def size(self, audience: str, **kwargs) -> typing.Union[int, None]:
+        """
+        Размер аудитории
+        ================
+
+        См. `Target.size`.
+
+        """
+        audiences = await self.select(**kwargs)
+        if audiences is None or 'size' not in audiences.columns:
+            return None
+        found = audiences[audiences.id.astype(str) == str(audience)]['size']
+        return None if found.empty or pd.isna(found.iloc[0]) else int(found.iloc[0])
+
+    async def aclose(self) -> None:
+        pass
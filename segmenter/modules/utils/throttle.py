@@ -0,0 +1,117 @@
+from threading import Lock
+from time import monotonic, sleep
+from weakref import WeakKeyDictionary
+import asyncio
+import typing
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов
+    =============================
+
+    Корзина пополняется со скоростью `rate` токенов в секунду до `capacity`
+    токенов; каждый запрос забирает токен, ожидая его появления при пустой
+    корзине. Потокобезопасна: один объект ограничивает все потоки,
+    обращающиеся к одному сервису.
+
+    Методы:
+        reserve: резервирование токенов без ожидания – для `asyncio` кода
+        acquire: получение токенов с ожиданием
+        penalize: опустошение корзины на `delay` секунд – например, по
+            `Retry-After` заголовку ответа сервиса
+
+    Свойства:
+        rate: скорость пополнения, токенов в секунду, None – без ограничения
+        capacity: емкость корзины – допустимый всплеск запросов
+
+    """
+
+    def __init__(
+        self,
+        rate: typing.Union[float, None],
+        capacity: typing.Union[float, None] = None
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity or max(rate or 1, 1)
+        self._tokens = self.capacity
+        self._updated = monotonic()
+        self._lock = Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Резервирование токенов
+        ======================
+
+        Забирает токены из корзины (в долг – при их нехватке) и возвращает
+        время, которое нужно выждать до их появления; позволяет ожидать без
+        блокировки потока – `await asyncio.sleep(bucket.reserve())`.
+
+        Возвращает:
+            float: время ожидания токенов в секундах
+
+        """
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            self._refill(monotonic())
+            self._tokens -= tokens
+            return max(-self._tokens / self.rate, 0.0)
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Получение токенов
+        =================
+
+        Возвращает:
+            float: время ожидания токенов в секундах
+
+        """
+        delay = self.reserve(tokens)
+        if delay:
+            sleep(delay)
+        return delay
+
+    def penalize(self, delay: float) -> None:
+        if not self.rate:
+            sleep(delay)
+            return
+        with self._lock:
+            self._refill(monotonic())
+            self._tokens = min(self._tokens, 0) - delay * self.rate
+
+class HostLimits:
+    """
+    Ограничитель одновременных запросов к хостам
+    ============================================
+
+    Выдает `asyncio.Semaphore` на каждый хост – общий для всех таргетов,
+    обращающихся к одному хосту, в рамках одного цикла событий. Лимит хоста
+    задается `hosts` словарем, по умолчанию – `limit`.
+
+        async with limits('api.example.com'):
+            ...
+
+    Свойства:
+        limit: лимит одновременных запросов к хосту по умолчанию
+        hosts: лимиты отдельных хостов
+
+    """
+
+    def __init__(
+        self,
+        limit: int = 8,
+        hosts: typing.Union[typing.Dict[str, int], None] = None
+    ) -> None:
+        self.limit = limit
+        self.hosts = hosts or {}
+        self._semaphores: WeakKeyDictionary = WeakKeyDictionary()
+
+    def __call__(self, host: str) -> asyncio.Semaphore:
+        semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if host not in semaphores:
+            semaphores[host] = asyncio.Semaphore(self.hosts.get(host, self.limit))
+        return semaphores[host]
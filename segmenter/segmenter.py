@@ -1,12 +1,22 @@
-from .modules import checks, refreshers, updaters
-from .modules.utils import Logger, Table
+from .modules.utils import (
+    HostLimits, IdSet, Logger, Manager, PoolMetrics, Table, catalog, cron_next, execute, 
+    fan_out, forget, read_frame, track_queries
+)
 from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from sqlalchemy import create_engine, engine
+from importlib import import_module
+from threading import Event
+from traceback import format_exception
+from sqlalchemy import create_engine, engine, text
 from uuid import uuid4
 from types import SimpleNamespace
+import numpy as np
 import pandas as pd
+import asyncio
 import inspect
+import re
+import signal
 import typing
 
 class Segmenter:
@@ -20,10 +30,19 @@ class Segmenter:
     *   __init__: инициализация объекта, сервисных апдейтеров и логирования,
             подключение к хранилищу данных, проверка доступности коллекций
     *   connect (contextmanager): подключение к хранилищу данных
+    *   unit (contextmanager): единица работы – одно подключение и одна
+            транзакция на все обращения к хранилищу внутри контекста
+    *   pool_status: получение метрик пула подключений
+    *   export_metrics: выгрузка метрик выполнения в текстовом формате 
+            Prometheus
+    *   close: запись оставшихся логов и освобождение подключений
+    *   reload: инкрементальное обновление конфигурации
     *   select_segments: получение актуальных сегментов
     *   refresh_segments: batch-пересчет сегментов
+    *   serve: резидентный режим – пересчет сегментов по их расписаниям
     *   select_audiences: получение перечня аудиторий (из кабинета)
-    *   update_audiences: обновление аудиторий
+    *   target: таргет потребителя
+    *   update_audiences: выгрузка сегментов в аудитории таргетов
 
     """
     def __init__(
@@ -31,7 +50,18 @@ class Segmenter:
         con: dict,
         cfg_table: str = 'segmenter',
         log_table: str = 'segmenter_log',
+        subs_table: str = 'segmenter_subscriptions',
+        sources_table: str = 'segmenter_sources',
         consumers: typing.Dict[str, typing.Dict[str, typing.Dict]] = {},
+        workers: int = 1,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        cfg_key: str = 'segment_id',
+        cfg_version: str = 'updated',
+        capture: str = 'full',
+        host_limit: int = 8,
+        host_limits: typing.Dict[str, int] = {},
+        track_members: bool = False,
         **kwargs
     ) -> None:
         """
@@ -49,12 +79,41 @@ class Segmenter:
             with self.connect(...) as con:
                 ... ### соединение подключено и может быть использовано
             ... ### соединение сброшено
+        Подключения выдаются из пула движка и возвращаются в него по завершении
+        работы контекстного менеджера. При инициализации обращения к хранилищу
+        не выполняются: конфигурация и атрибуты логовой таблицы читаются при
+        первом использовании.
                 
         Аргументы:
             con (dict): параметры подключения к хранилищу
             cfg_table (Table): конфигурационная таблица для обработки сегментов
             log_table (Table): таблица для сохранения логов работы менеджера
+            subs_table (Table): таблица подписок – для сохранения отметок 
+                синхронизации аудиторий (см. `self.update_audiences`)
+            sources_table (Table): таблица отпечатков источников сегментов –
+                для пропуска пересчетов с неизмененными источниками (см.
+                `checks.check_sources`)
+            consumers (dict): параметры таргетов потребителей вида
+                {идентификатор потребителя: {таргет: параметры таргета}}, 
+                см. `self.target`
             default_schema (str): дефолтная схема
+            workers (int): количество одновременно пересчитываемых сегментов
+            pool_size (int): количество постоянно удерживаемых пулом подключений,
+                не меньше `workers` + 1
+            max_overflow (int): количество подключений сверх `pool_size`
+            cfg_key (str): атрибут конфигурационной таблицы, идентифицирующий
+                сегмент
+            cfg_version (str): атрибут конфигурационной таблицы с моментом 
+                изменения записи – для инкрементального обновления `self.reload`
+            capture (str): уровень детализации логовых записей: "off", 
+                "summary" или "full" (см. `Logger.CAPTURE`)
+            host_limit (int): количество одновременных запросов асинхронных
+                таргетов к одному хосту
+            host_limits (dict): количество одновременных запросов к отдельным
+                хостам вида {хост: количество}
+            track_members (bool): хранить ли в памяти состав выгруженных 
+                аудиторий (см. `IdSet`) – для синхронизации только расхождений
+                при несовпадении размеров аудитории и сегмента
             **kwargs: дополнительные параметры подключения,
 
         Возвращает:
@@ -62,43 +121,239 @@ class Segmenter:
             
         """
         self.id = str(uuid4())
+        self.workers = workers
         self.sql_eng = create_engine(
-            '{driver}://{login}:{password}@{host}:{port}/{schema}'.format(**con)
+            '{driver}://{login}:{password}@{host}:{port}/{schema}'.format(**con),
+            pool_size=max(pool_size, workers + 1),
+            max_overflow=max_overflow,
+            pool_recycle=3600
+        )
+        self.pool_metrics = PoolMetrics(self.sql_eng)
+        track_queries(self.sql_eng)
+        self._unit: ContextVar[typing.Union[engine.Connection, None]] = ContextVar(
+            '_unit', default=None
+        )
+        self.logger = Logger(
+            self.id, Table(log_table), connect=self.connect, capture=capture
         )
-        self.logger = Logger(self.id, Table(log_table), connect=self.connect)
 
         ### Декорирование используемых функций методом логгера
-        global checks, refreshers, updaters
-        checks, refreshers = [
-            SimpleNamespace(
-                **{k:self.logger.decorate(v) for k,v in vars(_).items() if inspect.isfunction(v)}
-            ) for _ in (checks, refreshers)
+        self.checks, self.refreshers = [
+            SimpleNamespace(**{
+                k:self.logger.decorate(v) for k,v in vars(import_module(_, __package__)).items() \
+                    if inspect.isfunction(v)
+            }) for _ in ('.modules.checks', '.modules.refreshers')
         ]
+        self.reload = self.logger.decorate(self.reload)
         self.select_segments = self.logger.decorate(self.select_segments)
         self.refresh_segments = self.logger.decorate(self.refresh_segments)
+        self.update_audiences = self.logger.decorate(self.update_audiences)
         
+        ### Конфигурация читается при первом обращении (см. `self.reload`)
         self.cfg_table = Table(cfg_table)
-        checks.check_table(self.logger.table)
-        checks.check_table(self.cfg_table, get_data=True)
-        if not self.cfg_table.data.empty:
-            self.cfg_table.data.table_name = self.cfg_table.data.table_name.map(Table, 'ignore')
+        self.cfg_key = cfg_key
+        self.cfg_version = cfg_version
+        self._cfg_loaded = False
+        self._cfg_state: typing.Dict[str, str] = {}
     
-        ### Инициализация менеджеров
-        # self.managers = {k: Manager(id=k, **v) for k,v in consumers}
+        ### Таргеты потребителей создаются при первом обращении (см. `self.target`)
+        self.consumers = consumers or {}
+        self.managers: typing.Dict[str, Manager] = {}
+        self.limits = HostLimits(host_limit, host_limits)
+        self._synced: typing.Dict[typing.Tuple[str, str, str], datetime] = {}
+        self.track_members = track_members
+        self._members: typing.Dict[typing.Tuple[str, str, str], IdSet] = {}
+        self.subs_table = Table(subs_table)
+        self.sources_table = Table(sources_table)
+        ### Сегменты, не прошедшие проверку источников, и моменты предыдущей
+        ### проверки их готовности (см. `self.refresh_segments`)
+        self._held: typing.Dict[str, datetime] = {}
 
     @contextmanager
-    def connect(self) -> typing.Generator[engine.Connection, typing.Any, None]:
+    def connect(
+        self, 
+        shared: bool = True
+    ) -> typing.Generator[engine.Connection, typing.Any, None]:
         """
         Подключение к хранилищу данных
         ==============================
 
+        Внутри `self.unit()` контекста возвращает подключение единицы работы,
+        иначе – выдает подключение из пула.
+
+        Аргументы:
+            shared (bool): использовать ли подключение текущей единицы работы,
+                False – для записей, которые не должны откатываться вместе с 
+                ее транзакцией (например, логов)
+
         """
+        if shared and self._unit.get() is not None:
+            yield self._unit.get()
+            return
         con: engine.Connection = self.sql_eng.connect()
         try:
             yield con
         finally:
             con.close()
 
+    @contextmanager
+    def unit(self) -> typing.Generator[engine.Connection, typing.Any, None]:
+        """
+        Единица работы
+        ==============
+
+        Выдает из пула одно подключение и открывает в нем транзакцию, которые
+        используются всеми `self.connect()` обращениями внутри контекста (в 
+        рамках текущего потока). Транзакция фиксируется по завершении работы
+        контекстного менеджера, откатывается – в случае исключения или может
+        быть откачена явно через `con.get_transaction().rollback()`.
+
+        """
+        with self.sql_eng.connect() as con:
+            trans = con.begin()
+            token = self._unit.set(con)
+            try:
+                yield con
+            except Exception:
+                if trans.is_active:
+                    trans.rollback()
+                raise
+            else:
+                if trans.is_active:
+                    trans.commit()
+            finally:
+                self._unit.reset(token)
+
+    def pool_status(self) -> typing.Dict[str, typing.Union[int, float]]:
+        """
+        Метрики пула подключений
+        ========================
+
+        """
+        return self.pool_metrics.snapshot()
+
+    def export_metrics(self, path: str) -> None:
+        """
+        Выгрузка метрик выполнения
+        ==========================
+
+        Записывает накопленные логгером метрики действий (см. `Logger.metrics`)
+        и метрики пула подключений в файл в текстовом формате Prometheus.
+
+        Аргументы:
+            path (str): путь к файлу метрик
+
+        """
+        self.logger.metrics.export(path, self.pool_status())
+
+    def close(self) -> None:
+        """
+        Завершение работы
+        =================
+
+        Записывает оставшиеся в буфере логовые записи и закрывает подключения
+        пула и сессии таргетов.
+
+        """
+        for _ in self.managers.values():
+            _.close()
+        self.logger.close()
+        self.sql_eng.dispose()
+
+    def reload(
+        self,
+        con: engine.Connection,
+        **kwargs
+    ) -> typing.Tuple[pd.DataFrame, typing.Union[bool, None]]:
+        """
+        Обновление конфигурации
+        =======================
+
+        Декорируется `logger.decorate(...)` методом в рамках работы сегментера.
+
+        Метод обновляет `self.cfg_table.data` без полного перечитывания 
+        конфигурационной таблицы:
+        *   одним агрегирующим запросом получает по каждому сегменту отпечаток
+                его состояния – хэш количества записей и моментов их изменения
+                (`cfg_version`),
+        *   перечитывает записи только тех сегментов, которые появились или
+                отпечаток которых отличается от полученного при предыдущем 
+                обновлении: сравнение по сегменту, а не по общей отметке, не 
+                зависит от совпадения моментов изменения разных записей,
+        *   удаляет из датафрейма отсутствующие в таблице сегменты.
+        `Table` объекты неизменных сегментов сохраняются, метаданные таблиц
+        измененных сегментов сбрасываются из кэша `utils.catalog`, перечни
+        атрибутов их запросов – из кэша `utils.describe`. При первом
+        вызове или без `cfg_version` атрибута конфигурация читается полностью.
+
+        Возвращает:
+            typing.Tuple[pd.DataFrame, typing.Union[bool, None]]:
+                кортеж, содержащий датафрейм c перечитанными записями
+
+        """
+        data, key, version = self.cfg_table.data, self.cfg_key, self.cfg_version
+
+        def _state() -> typing.Dict[str, str]:
+            ### Отпечатки читаются до записей: изменение между запросами 
+            ### приводит к повторному перечитыванию, а не к его пропуску
+            return read_frame("""
+                select {key}::text as key
+                    , md5(count(*) || ':' || string_agg(
+                        coalesce({version}::text, ''), ',' order by {version}::text
+                    )) as state
+                from {table}
+                group by 1;
+            """.format(key=key, version=version, table=self.cfg_table), con
+            ).set_index('key').state.to_dict()
+
+        def _forget(segments: pd.DataFrame) -> None:
+            ### Перечни атрибутов прежних и новых запросов сегментов
+            for params in segments.get('refresh_params', pd.Series(dtype=object)):
+                sql = params.get('query', {}).get('sql') if isinstance(params, dict) else None
+                if sql:
+                    forget(sql)
+
+        if not self._cfg_loaded or version not in data.columns:
+            if self._cfg_loaded:
+                self.logger.warning(
+                    'Атрибут {} отсутствует, конфигурация перечитывается полностью', version
+                )
+            ### Без `cfg_version` атрибута следующее обновление также полное
+            state = _state() if version in catalog.columns(self.cfg_table, con).column_name.values \
+                else {}
+            data = read_frame('select * from {};'.format(self.cfg_table), con)
+            for _ in data.table_name.dropna().unique():
+                catalog.invalidate(_)
+            forget()
+            data.table_name = data.table_name.map(Table, 'ignore')
+            self.cfg_table.data = data
+            self._cfg_loaded = True
+            self._cfg_state = state
+            return (data, None)
+
+        state = _state()
+        changed = [k for k, v in state.items() if self._cfg_state.get(k) != v]
+
+        fetched = read_frame("""
+            select *
+            from {table}
+            where {key}::text = any(:keys);
+        """.format(key=key, table=self.cfg_table), con, {'keys': changed}) \
+            if changed else data.iloc[:0].copy()
+        for _ in fetched.table_name.dropna().unique():
+            catalog.invalidate(_)
+        if not fetched.empty:
+            fetched.table_name = fetched.table_name.map(Table, 'ignore')
+
+        keys = data[key].astype(str)
+        _forget(pd.concat([data[~keys.isin([*state]) | keys.isin(changed)], fetched]))
+        self.cfg_table.data = pd.concat([
+            data[keys.isin([*state]) & ~keys.isin(changed)], fetched
+        ], ignore_index=True)
+        self._cfg_state = state
+
+        return (fetched, None)
+
     def select_segments(
         self, 
         **kwargs
@@ -116,16 +371,25 @@ class Segmenter:
         *   иметь параметры обновления: `refresh_params` != '{}'
 
         """
+        if not self._cfg_loaded:
+            self.reload()
+
         return (self.cfg_table.data[
              self.cfg_table.data.refresh_auto & 
             ~self.cfg_table.data.refresh_cron.isna() &
             (self.cfg_table.data.refresh_params != {})
-        ][
-            ['segment_id', 'segment_name', 'table_name', 'refresh_cron', 'refresh_params']
-        ].copy(), None)
+        ][[
+            _ for _ in (
+                'segment_id', 'segment_name', 'table_name', 'refresh_cron',
+                'refresh_params', 'refresh_depends'
+            ) if _ in self.cfg_table.data.columns
+        ]].copy(), None)
 
     def refresh_segments(
         self,
+        workers: typing.Union[int, None] = None,
+        date: typing.Union[datetime, None] = None,
+        since: typing.Union[datetime, None] = None,
         **kwargs
     ) -> typing.Tuple[pd.DataFrame, typing.Union[bool, None]]:
         """
@@ -138,30 +402,170 @@ class Segmenter:
             * наличие таблиц (check_table),
             * согласованность с конфигурационной таблицей (check_consistency),
             * соответстие по `refresh_cron` (check_cron),
-            * TODO: прогруженность таблиц источников или любое другое условие, 
-                реализованное в `checks` модуле
-        и обновить сегмент соответствующим рефрешером.
+            * изменение и прогруженность таблиц источников (check_sources),
+            * любое другое условие, реализованное в `checks` модуле
+        и обновить сегмент соответствующим рефрешером. Проверки, имеющие пакетный
+        вариант (см. `checks`), выполняются одним вызовом для всех сегментов.
+
+        Сегменты пересчитываются параллельно в пуле из `workers` потоков, каждый
+        в собственной единице работы `self.unit()`: проверки, рефрешер и его
+        итоговый запрос выполняются в одном подключении и одной транзакции.
+        Сегмент, перечисливший в `refresh_depends` идентификаторы других
+        сегментов, пересчитывается только после них и пропускается, если
+        пересчет любого из них завершился ошибкой. Составной сегмент (см.
+        `refreshers.refresh_composite`) так же зависит от сегментов своего
+        выражения. Сегменты с циклическими зависимостями или определениями и
+        зависящие от них не пересчитываются, как и сегменты, пересчет которых
+        завершился исключением, – остальные сегменты пересчитываются
+        независимо от них.
+
+        Для сегментов, не прошедших проверку источников (прогружаемых или без
+        изменений – в том числе из-за запоздалой статистики), момент `since`
+        сохраняется до их пересчета: они проверяются повторно при каждом
+        следующем вызове, пока сработавшее расписание не приведет к пересчету.
+
+        Аргументы:
+            workers (int): количество одновременно пересчитываемых сегментов,
+                по умолчанию – `self.workers`
+            date (datetime): момент проверки готовности, по умолчанию – текущий
+            since (datetime): момент предыдущей проверки готовности
 
         Возвращает:
             typing.Tuple[pd.DataFrame, typing.Union[bool, None]]:
                 кортеж, содержащий датафрейм c переченем сегментов
 
         """
-        global refreshers
-        refreshed = pd.DataFrame()
-        
-        for _ in self.select_segments()[0].itertuples(index=False):
-            skip = False
-            for check in checks.__dict__.values():
-                if not check(**_._asdict()):
-                    skip = True
-            if skip:
-                continue
-            refresh, params = (*_.refresh_params.items(),)[0]
-            vars(refreshers)['refresh_' + refresh](**_._asdict(), **params)
-            refreshed = pd.concat([refreshed, pd.DataFrame([_])], ignore_index=True)
-        
-        return (refreshed, None)
+        from .modules.refreshers.composite import (
+            circular as composite_circular, depends as composite_depends
+        )
+
+        checks, refreshers = self.checks, self.refreshers
+
+        def _refresh(segment: dict) -> typing.Union[dict, bool, None]:
+            """
+            Пересчет сегмента: False – если сегмент не прошел проверки, None –
+            в случае ошибки рефрешера, иначе – запись сегмента
+            """
+            if str(segment['segment_id']) in circular:
+                self.logger.error(
+                    'Циклическое определение составного сегмента {}', segment['segment_id']
+                )
+                return None
+            with self.unit() as con:
+                for name, check in vars(checks).items():
+                    if name in batches or name.endswith('_batch'):
+                        continue
+                    if not check(**segment, sources_table=self.sources_table):
+                        con.get_transaction().rollback()
+                        if name == 'check_sources':
+                            held.add(str(segment['segment_id']))
+                        return False
+                refresh, params = (*segment['refresh_params'].items(),)[0]
+                if vars(refreshers)['refresh_' + refresh](**segment, **params) is None:
+                    con.get_transaction().rollback()
+                    return None
+            return segment
+
+        batches = [k[:-len('_batch')] for k in vars(checks) if k.endswith('_batch')]
+        date = date or datetime.now()
+
+        segments = self.select_segments()
+        composites = composite_depends(segments)
+        circular = composite_circular(composites)
+        composites = {k: v for k, v in composites.items() if k not in circular}
+        held, since = set(), since if since is None else \
+            segments.segment_id.astype(str).map(self._held).fillna(since)
+        pending = {} if since is None else dict(zip(segments.segment_id.astype(str), since))
+        for _ in batches:
+            ready = vars(checks)[_ + '_batch'](
+                data=segments, date=date, since=since if since is None else since[segments.index]
+            )
+            segments = segments[ready.reindex(segments.index, fill_value=False).astype(bool)] \
+                if ready is not None else segments.iloc[:0]
+        segments = {
+            str(_['segment_id']): _ for _ in segments.to_dict('records')
+        }
+        refreshed = execute(
+            _refresh,
+            segments,
+            depends={
+                k: [*map(str, v.get('refresh_depends') or ()), *composites.get(k, ())]
+                    for k,v in segments.items()
+            },
+            workers=workers or self.workers,
+            logger=self.logger
+        )
+        self._held = {k: v for k, v in pending.items() if k in held}
+
+        return (pd.DataFrame(
+            [_ for _ in refreshed.values() if _], 
+            columns=[*next(iter(segments.values()), {})]
+        ), None)
+
+    def serve(
+        self,
+        interval: float = 300,
+        stop: typing.Union[Event, None] = None,
+        metrics: typing.Union[str, None] = None
+    ) -> None:
+        """
+        Резидентный режим
+        =================
+
+        Метод работает до получения SIGINT/SIGTERM сигнала или установки `stop`
+        события: рассчитывает ближайшее после предыдущего пересчета срабатывание
+        CRON-расписаний сегментов, ожидает его и пересчитывает только готовые
+        сегменты – сработавшие после предыдущего пересчета (см. `since` 
+        аргумент `refresh_segments`); сегменты, отложенные или пропущенные
+        проверкой источников, повторно проверяются при следующем пересчете.
+        Подключения пула, кэши метаданных и разобранные расписания сохраняются
+        между пересчетами; конфигурация обновляется инкрементально
+        (`self.reload`) не реже раза в `interval` секунд. По завершении работы
+        текущий пересчет доводится до конца, после чего вызывается
+        `self.close()`.
+
+        Аргументы:
+            interval (float): максимальное время ожидания в секундах между 
+                обновлениями конфигурации
+            stop (threading.Event): событие остановки
+            metrics (str): путь к файлу метрик, обновляемому после каждого
+                пересчета (см. `self.export_metrics`)
+
+        """
+        stop = stop or Event()
+        handlers = {}
+        for _ in (signal.SIGINT, signal.SIGTERM):
+            try:
+                handlers[_] = signal.signal(_, lambda *args: stop.set())
+            except ValueError:
+                ### Обработчики устанавливаются только из главного потока
+                pass
+
+        self.logger.info('Запущен резидентный режим')
+        since = datetime.now()
+        try:
+            while not stop.is_set():
+                self.reload()
+                segments = self.select_segments()
+                next_date = cron_next(segments.refresh_cron, since) \
+                    if segments is not None else None
+                delay = interval if next_date is None else \
+                    (next_date - datetime.now()).total_seconds()
+                if delay > 0:
+                    stop.wait(min(delay, interval))
+                    continue
+                date = datetime.now()
+                refreshed = self.refresh_segments(date=date, since=since)
+                since = date
+                if refreshed is not None and not refreshed.empty:
+                    self.update_audiences(segments=refreshed)
+                if metrics:
+                    self.export_metrics(metrics)
+        finally:
+            for k, v in handlers.items():
+                signal.signal(k, v)
+            self.logger.info('Резидентный режим остановлен')
+            self.close()
 
     # def select_audiences(self):
     #     """
@@ -179,17 +583,313 @@ class Segmenter:
     #     ].itertuples():
     #         self.logger.decorate((self.updaters[target].select()))
 
-    def update_audiences(self):
+    def target(self, consumer: str, target: str) -> typing.Any:
+        """
+        Таргет потребителя
+        ==================
+
+        Возвращает таргет `target` менеджера потребителя `consumer` (см.
+        `Manager`), создаваемого по его параметрам из `self.consumers`.
+        Асинхронные таргеты получают общий ограничитель запросов к хостам
+        `self.limits`.
+
+        Возвращает:
+            Target: таргет или None – при отсутствии параметров или класса
+
+        """
+        key = str(consumer)
+        if key not in self.managers:
+            self.managers[key] = Manager(
+                key, self.consumers.get(key, {}), self.logger, self.limits
+            )
+        return self.managers[key].target(target)
+
+    def update_audiences(
+        self,
+        con: engine.Connection,
+        segments: typing.Union[pd.DataFrame, None] = None,
+        full: bool = False,
+        **kwargs
+    ) -> typing.Tuple[pd.DataFrame, typing.Union[bool, None]]:
         """
         Обновление аудиторий
         ====================
+
+        Декорируется `logger.decorate(...)` методом в рамках работы сегментера.
         
-        Для каждого актуального и успешно обновленного сегмента:
+        Для каждой подписки (`update_consumer`, `update_target` атрибуты
+        конфигурационной таблицы) на актуальный и успешно обновленный сегмент
+        из `segments` (по умолчанию – на все сегменты) синхронизирует аудиторию
+        `update_name` таргета с сегментом. Аудитория создается при отсутствии;
+        `{{атрибут}}` подстановки в ее наименовании заменяются атрибутами 
+        сегмента.
+
+        Выгружаются только изменения состава сегмента с момента предыдущей 
+        успешной синхронизации подписки (`synced` атрибут подписки) по его SCD2
+        истории (см. `audience_deltas`): вошедшие идентификаторы добавляются в
+        аудиторию, выбывшие – удаляются из нее. Если размер аудитории по данным
+        таргета (см. `Target.size`) расходится с размером сегмента, выполняется
+        полная синхронизация; при `self.track_members` и совпадении размера 
+        аудитории с сохраненным составом выгруженной аудитории (см. `IdSet`)
+        выгружаются только расхождения сегмента с этим составом. Отметка
+        синхронизации сохраняется только после успешной выгрузки всех 
+        изменений; ошибка выгрузки одной подписки не прерывает выгрузку
+        остальных.
+
+        Подписки синхронизируются в цикле событий: изменения каждого сегмента
+        читаются один раз на все его подписки с одинаковой отметкой 
+        синхронизации – в собственном подключении (не больше размера пула
+        одновременно) – и раздаются их таргетам параллельно `fan_out`
+        конвейером с ограниченными очередями; отметки и размеры сегментов
+        также читаются в отдельных потоках и собственных подключениях, ошибки
+        подписок логируются по каждой из них. Методы синхронных таргетов
+        вызываются в отдельных потоках, поэтому выгрузку не следует вызывать
+        внутри `self.unit()`; одновременные запросы асинхронных таргетов (см.
+        `AsyncTarget`) к хостам ограничиваются `self.limits`.
+
+        Аргументы:
+            segments (pd.DataFrame): обновленные сегменты – результат
+                `self.refresh_segments`
+            full (bool): выполнить полную синхронизацию всех подписок
+
+        Возвращает:
+            typing.Tuple[pd.DataFrame, typing.Union[bool, None]]:
+                кортеж, содержащий датафрейм с количеством добавленных и 
+                удаленных идентификаторов по каждой подписке
 
         """
-        # for _ in self.managers:
-        pass
+        from .modules.refreshers.merge import audience_deltas, audience_size, watermark
+
+        if not self._cfg_loaded:
+            self.reload()
+
+        columns = [
+            self.cfg_key, 'update_consumer', 'update_target', 'audience', 
+            'added', 'removed', 'full', 'synced'
+        ]
+        data = self.cfg_table.data
+        if not {'update_consumer', 'update_target'} <= set(data.columns):
+            return (pd.DataFrame(columns=columns), None)
+        subscriptions = data[data.update_consumer.notna() & data.update_target.notna()]
+        if segments is not None:
+            subscriptions = subscriptions[subscriptions[self.cfg_key].astype(str).isin(
+                segments[self.cfg_key].astype(str)
+            )]
+
+        async def _call(method: typing.Callable, *args, **kwargs) -> typing.Any:
+            """
+            Вызов метода таргета – асинхронного в цикле событий, синхронного –
+            в отдельном потоке
+            """
+            if inspect.iscoroutinefunction(method):
+                return await method(*args, **kwargs)
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        async def _plan(subscription: dict, target) -> typing.Union[dict, None]:
+            """
+            Аудитория и момент предыдущей синхронизации подписки
+            """
+            key = (
+                str(subscription[self.cfg_key]), 
+                str(subscription['update_consumer']), 
+                str(subscription['update_target'])
+            )
+            params = {**(subscription.get('update_params') or {})}
+            audience = params.pop('audience', None) or await _call(target.audience, name=re.sub(
+                r'{{\s*(\w+)\s*}}',
+                lambda x: str(subscription.get(x[1], subscription.get('segment_' + x[1], x[0]))),
+                subscription.get('update_name') or '{{name}}'
+            ), **params)
+            if audience is None:
+                return None
+            since = self._synced.get(key, subscription.get('update_synced'))
+            return {
+                'subscription': subscription,
+                'key': key,
+                'target': target,
+                'audience': audience,
+                'params': params,
+                'table_name': Table(str(subscription['table_name'])),
+                'since': None if full or since is None or pd.isna(since) \
+                    else pd.Timestamp(since).to_pydatetime(),
+            }
+
+        def _filtered(chunks: typing.Iterator[pd.DataFrame], members: IdSet) -> typing.Iterator[pd.DataFrame]:
+            """
+            Изменения полной синхронизации, расходящиеся с составом аудитории:
+            отсутствующие в ней вошедшие и присутствующие выбывшие
+            """
+            for chunk in chunks:
+                held = members.mask(chunk.id)
+                yield chunk[np.where(chunk.change == 'added', ~held, held)]
+
+        def _recorded(chunks: typing.Iterator[pd.DataFrame], hashes: dict) -> typing.Iterator[pd.DataFrame]:
+            """
+            Пачки изменений с сохранением хэшей их идентификаторов
+            """
+            for chunk in chunks:
+                for change, ids in chunk.groupby('change').id:
+                    hashes[change].append(IdSet.hash(ids))
+                yield chunk
+
+        async def _deliver(
+            plans: typing.List[dict], 
+            since: typing.Union[datetime, None],
+            members: typing.Union[IdSet, None] = None
+        ) -> None:
+            """
+            Выгрузка изменений сегмента во все таргеты подписок – с одним 
+            чтением сегмента в собственном подключении
+            """
+            hashes = {'added': [], 'removed': []}
+            async with readers:
+                with self.connect(shared=False) as _con:
+                    chunks = audience_deltas(
+                        plans[0]['table_name'], _con, since, plans[0]['until'], since is None
+                    )
+                    if members is not None:
+                        chunks = _filtered(chunks, members)
+                    if self.track_members:
+                        chunks = _recorded(chunks, hashes)
+                    synced = await fan_out(
+                        chunks, [(_['target'], _['audience'], _['params']) for _ in plans]
+                    )
+            added, removed = (IdSet(np.concatenate([np.empty(0, np.uint64), *hashes[_]])) \
+                for _ in ('added', 'removed'))
+            for plan, _ in zip(plans, synced):
+                plan.update({'synced': _, 'full': since is None})
+                if not self.track_members:
+                    continue
+                if _ is None:
+                    self._members.pop(plan['key'], None)
+                elif since is None and members is None:
+                    self._members[plan['key']] = added
+                elif plan['key'] in self._members:
+                    self._members[plan['key']] = (self._members[plan['key']] | added) - removed
+
+        async def _check(plan: dict) -> None:
+            """
+            Сверка размера аудитории с сегментом и полная синхронизация при
+            расхождении
+            """
+            if plan['synced'] is None or plan['full']:
+                return
+            size = await _call(plan['target'].size, plan['audience'], **plan['params'])
+            if size is not None and size != await _read(audience_size, plan['table_name'], plan['until']):
+                members = self._members.get(plan['key'])
+                if members is not None and len(members) != size:
+                    members = None
+                self.logger.warning(
+                    'Размер аудитории {} ({}) расходится с сегментом – {}', plan['audience'], size,
+                    'полная синхронизация' if members is None else 'синхронизация расхождений'
+                )
+                await _deliver([plan], None, members)
+
+        async def _read(func: typing.Callable, table_name: Table, *args) -> typing.Any:
+            """
+            Чтение сегмента в отдельном потоке и собственном подключении
+            """
+            def _run() -> typing.Any:
+                with self.connect(shared=False) as _con:
+                    return func(table_name, _con, *args)
+
+            async with readers:
+                return await asyncio.to_thread(_run)
+
+        def _failed(subscriptions: typing.Iterable[dict], error: BaseException) -> None:
+            """
+            Логирование ошибки синхронизации подписок
+            """
+            for _ in subscriptions:
+                self.logger.error(
+                    'Ошибка синхронизации подписки {} – {} – {}:\n{}',
+                    _[self.cfg_key], _['update_consumer'], _['update_target'],
+                    ''.join(format_exception(type(error), error, error.__traceback__))
+                )
+
+        async def _drive(pending: typing.List[tuple]) -> typing.List[dict]:
+            """
+            Синхронизация подписок
+            """
+            nonlocal readers
+            readers = asyncio.Semaphore(self.sql_eng.pool.size())
+            try:
+                plans, groups = [], {}
+                for (subscription, _), plan in zip(pending, await asyncio.gather(
+                    *(_plan(*_) for _ in pending), return_exceptions=True
+                )):
+                    if isinstance(plan, BaseException):
+                        _failed([subscription], plan)
+                    elif plan is not None:
+                        plans.append(plan)
+
+                tables = [*dict.fromkeys(_['table_name'] for _ in plans)]
+                watermarks = dict(zip(tables, await asyncio.gather(
+                    *(_read(watermark, _) for _ in tables), return_exceptions=True
+                )))
+                for plan in [*plans]:
+                    plan['until'] = until = watermarks[plan['table_name']]
+                    if isinstance(until, BaseException):
+                        _failed([plan['subscription']], until)
+                    if isinstance(until, BaseException) or until is None or \
+                        (plan['since'] is not None and until <= plan['since']):
+                        plans.remove(plan)
+                        continue
+                    groups.setdefault((str(plan['table_name']), plan['since']), []).append(plan)
+
+                for group, error in zip(groups.values(), await asyncio.gather(
+                    *(_deliver(v, k[1]) for k, v in groups.items()), return_exceptions=True
+                )):
+                    if isinstance(error, BaseException):
+                        _failed([_['subscription'] for _ in group], error)
+                        for _ in group:
+                            _['synced'] = None
+                for plan, error in zip(plans, await asyncio.gather(
+                    *map(_check, plans), return_exceptions=True
+                )):
+                    if isinstance(error, BaseException):
+                        _failed([plan['subscription']], error)
+                return plans
+            finally:
+                for _ in self.managers.values():
+                    await _.aclose()
+
+        readers = None
+        pending = []
+        for subscription in subscriptions.to_dict('records'):
+            target = self.target(subscription['update_consumer'], subscription['update_target'])
+            if target is not None:
+                pending.append((subscription, target))
+
+        result = []
+        for plan in asyncio.run(_drive(pending)) if pending else []:
+            if plan['synced'] is None:
+                continue
+            key, until = plan['key'], plan['until']
+            self._synced[key] = until
+            try:
+                with self.connect(shared=False) as _, _.begin():
+                    _.execute(text("""
+                        update {} set synced = :synced, status = 'uploaded'
+                        where true
+                            and segment_id::text = :segment
+                            and consumer_id::text = :consumer
+                            and target = :target
+                            and actual_end = 'infinity';
+                    """.format(self.subs_table)), {
+                        'synced': until, 'segment': key[0], 'consumer': key[1], 'target': key[2]
+                    })
+            except Exception as e:
+                self.logger.warning('Не сохранена отметка синхронизации подписки: {}', e)
+            result.append({
+                self.cfg_key: plan['subscription'][self.cfg_key],
+                'update_consumer': plan['subscription']['update_consumer'],
+                'update_target': plan['subscription']['update_target'],
+                'audience': plan['audience'],
+                'added': plan['synced'][0],
+                'removed': plan['synced'][1],
+                'full': plan['full'],
+                'synced': until,
+            })
 
-        # consumer
-            # segment
-                # target
\ No newline at end of file
+        return (pd.DataFrame(result, columns=columns), None)
@@ -0,0 +1,96 @@
+"""
+Нормализация и хэширование контактов
+====================================
+
+Проверки нормализаторов `utils.hashing` на целых, дробных, смешанных и
+пропущенных значениях и `Hasher` без хранилища:
+
+    python -m pytest tests
+
+"""
+import hashlib
+import unittest
+
+import pandas as pd
+
+from segmenter.modules.utils import Hasher
+from segmenter.modules.utils.hashing import normalize_email, normalize_phone
+
+class NormalizeTest(unittest.TestCase):
+
+    def assertValues(self, result: pd.Series, expected: list) -> None:
+        self.assertEqual(result.where(result.notna(), None).tolist(), expected)
+
+    def test_phone_int(self) -> None:
+        self.assertValues(
+            normalize_phone(pd.Series([79161234567, 89161234567, 9161234567])),
+            ['+79161234567'] * 3
+        )
+
+    def test_phone_float(self) -> None:
+        self.assertValues(
+            normalize_phone(pd.Series([79161234567.0, None, 9161234567.5])),
+            ['+79161234567', None, None]
+        )
+
+    def test_phone_mixed(self) -> None:
+        self.assertValues(
+            normalize_phone(
+                pd.Series(['8 (916) 123-45-67', 9161234567, 79161234567.0, None, 'нет'])
+            ),
+            ['+79161234567'] * 3 + [None, None]
+        )
+        self.assertValues(
+            normalize_phone(pd.Series(['8 916 123 45 67']), country='375', plus=False),
+            ['375' + '9161234567']
+        )
+
+    def test_phone_null(self) -> None:
+        self.assertValues(normalize_phone(pd.Series([None, None], dtype=object)), [None, None])
+        self.assertValues(normalize_phone(pd.Series([float('nan')])), [None])
+        self.assertValues(normalize_phone(pd.Series([], dtype=object)), [])
+
+    def test_email(self) -> None:
+        self.assertValues(
+            normalize_email(pd.Series([' A@X.ru ', 'b@x.ru', '  '])),
+            ['a@x.ru', 'b@x.ru', None]
+        )
+
+    def test_email_numbers(self) -> None:
+        self.assertValues(normalize_email(pd.Series([123, 456])), ['123', '456'])
+        self.assertValues(normalize_email(pd.Series([123.0, None])), ['123', None])
+        self.assertValues(
+            normalize_email(pd.Series(['A@x.ru', 123, 4.0, None])),
+            ['a@x.ru', '123', '4', None]
+        )
+
+    def test_email_null(self) -> None:
+        self.assertValues(normalize_email(pd.Series([None, None], dtype=object)), [None, None])
+        self.assertValues(normalize_email(pd.Series([], dtype=float)), [])
+
+class HasherTest(unittest.TestCase):
+
+    def test_hashes(self) -> None:
+        hasher = Hasher('email', 'md5')
+        result = hasher([' A@x.ru', 'a@x.ru', None, 'b@x.ru'])
+        self.assertEqual(result.index.tolist(), [0, 1, 3])
+        self.assertEqual(result.tolist(), [
+            *[hashlib.md5(b'a@x.ru').hexdigest()] * 2, hashlib.md5(b'b@x.ru').hexdigest()
+        ])
+        self.assertTrue(hasher([]).empty)
+
+    def test_pool(self) -> None:
+        hasher = Hasher('phone', workers=2, chunksize=10, cache_size=0)
+        self.addCleanup(hasher.close)
+        phones = pd.Series(range(9160000000, 9160000100))
+        first = hasher(phones)
+        pool = hasher._pool
+        self.assertIsNotNone(pool)
+        self.assertEqual(hasher(phones).tolist(), first.tolist())
+        self.assertIs(hasher._pool, pool)
+        self.assertEqual(
+            first.iloc[0], hashlib.sha256(b'+79160000000').hexdigest()
+        )
+
+if __name__ == '__main__':
+    unittest.main()
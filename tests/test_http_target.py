@@ -0,0 +1,139 @@
+"""
+Выгрузка аудиторий HTTP таргетом
+================================
+
+Проверки `HttpTarget` и `AsyncHttpTarget` против тестового HTTP сервиса
+аудиторий (см. `benchmarks/http_mock.py`), запущенного в фоновом потоке:
+
+    python -m pytest tests
+
+"""
+from contextlib import contextmanager
+from pathlib import Path
+import asyncio
+import hashlib
+import sys
+import unittest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'benchmarks'))
+
+from http_mock import start
+from segmenter.modules.updaters.http import AsyncHttpTarget, HttpTarget
+from segmenter.modules.utils import Logger, Table
+
+class _Sink:
+    """
+    Буфер логовых записей без записи в хранилище
+    """
+    def __init__(self) -> None:
+        self.records = []
+
+    def put(self, record: dict) -> None:
+        self.records.append(record)
+
+    def close(self) -> None:
+        pass
+
+class HttpTargetTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.connections = 0
+
+        @contextmanager
+        def connect(shared: bool = True):
+            self.connections += 1
+            yield None
+
+        self.sink = _Sink()
+        self.logger = Logger(
+            'test', Table('segmenter_log'), connect=connect, sink=self.sink, capture='summary'
+        )
+
+    def serve(self, **kwargs) -> str:
+        server, self.state = start(**kwargs)
+        self.addCleanup(server.shutdown)
+        return 'http://{}:{}'.format(*server.server_address)
+
+    def members(self, audience: str) -> set:
+        return self.state.audiences[audience]['ids']
+
+    def test_upload(self) -> None:
+        target = HttpTarget(
+            self.logger, base_url=self.serve(), chunksize=100, workers=4, rate=None
+        )
+        self.addCleanup(target.close)
+
+        audience = target.audience('test')
+        self.assertEqual(target.audience('test'), audience)
+        self.assertIsNotNone(target.update(audience=audience, ids=range(1000)))
+        self.assertIsNotNone(target.remove(audience=audience, ids=range(900, 1000)))
+
+        self.assertEqual(self.members(audience), {*map(str, range(900))})
+        self.assertEqual(target.size(audience), 900)
+        self.assertFalse([_ for _ in self.sink.records if _['error']])
+
+    def test_no_connection(self) -> None:
+        ### Сетевые методы таргета не занимают подключения к хранилищу
+        target = HttpTarget(self.logger, base_url=self.serve(), chunksize=10, rate=None)
+        self.addCleanup(target.close)
+
+        audience = target.audience('test')
+        target.update(audience=audience, ids=range(100))
+        target.size(audience)
+        self.assertEqual(self.connections, 0)
+        self.assertTrue(self.sink.records)
+
+    def test_throttling_and_retries(self) -> None:
+        target = HttpTarget(
+            self.logger, base_url=self.serve(rate=20, fail=0.2),
+            chunksize=10, workers=4, rate=15, retries=8, backoff=0.01
+        )
+        self.addCleanup(target.close)
+
+        audience = target.audience('test')
+        self.assertIsNotNone(target.update(audience=audience, ids=range(300)))
+        self.assertEqual(self.members(audience), {*map(str, range(300))})
+        self.assertGreater(self.state.failed, 0)
+
+    def test_failure(self) -> None:
+        target = HttpTarget(
+            self.logger, base_url=self.serve(fail=1.0), retries=1, backoff=0.01, rate=None
+        )
+        self.addCleanup(target.close)
+
+        self.assertIsNone(target.update(audience='1', ids=range(10)))
+        self.assertTrue([_ for _ in self.sink.records if _['error']])
+
+    def test_hashing(self) -> None:
+        target = HttpTarget(
+            self.logger, base_url=self.serve(), rate=None,
+            hashing={'kind': 'email', 'algorithm': 'md5'}
+        )
+        self.addCleanup(target.close)
+
+        audience = target.audience('test')
+        target.update(audience=audience, ids=[' A@x.ru', 'a@x.ru', None])
+        self.assertEqual(self.members(audience), {hashlib.md5(b'a@x.ru').hexdigest()})
+        self.assertEqual(self.connections, 0)
+
+    def test_async_upload(self) -> None:
+        target = AsyncHttpTarget(self.logger, base_url=self.serve(), chunksize=100, rate=None)
+
+        async def _run() -> str:
+            try:
+                audience = await target.audience('test')
+                await asyncio.gather(
+                    target.update(audience=audience, ids=range(500)),
+                    target.update(audience=audience, ids=range(500, 1000))
+                )
+                await target.remove(audience=audience, ids=range(100))
+                return audience
+            finally:
+                await target.aclose()
+
+        audience = asyncio.run(_run())
+        self.assertEqual(self.members(audience), {*map(str, range(100, 1000))})
+        self.assertEqual(self.connections, 0)
+
+if __name__ == '__main__':
+    unittest.main()